@@ -0,0 +1,99 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.models.requests import ProfileArmRequest
+from app.core.admission import admission_controller
+from app.core.session_manager import session_manager
+from app.core.profiler import profiler, format_folded
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/admission")
+async def admission_metrics():
+    """
+    アドミッション制御のメトリクスを取得
+    
+    Returns:
+        dict: リソースごとのキュー深さ、待ち時間（平均・p95・最大）、拒否数
+    """
+    return admission_controller.metrics()
+
+
+def _require_memory_report():
+    """メモリレポートが無効な場合は404"""
+    if not settings.memory_report_enabled:
+        raise HTTPException(status_code=404, detail="Memory report is disabled")
+
+
+@router.get("/memory")
+async def memory_report():
+    """
+    セッションごとのメモリ使用量を取得
+    
+    Returns:
+        dict: セッションごとの固有バイト数・共有バイト数と、ゲームごとのInternPoolの使用量
+              （ゲーム環境は含まず、保持数のみ）
+    """
+    _require_memory_report()
+    return session_manager.memory_report()
+
+
+def _require_profiling():
+    """プロファイリングが無効な場合は404"""
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+
+
+@router.post("/profiling/arm")
+async def arm_profiling(request: ProfileArmRequest):
+    """
+    次のN件のリクエストをプロファイルするよう予約
+    
+    Args:
+        request: 予約リクエスト（count, route, session_id）
+    
+    Returns:
+        dict: 登録された予約
+    """
+    _require_profiling()
+    return profiler.arm(request.count, route=request.route, session_id=request.session_id)
+
+
+@router.get("/profiling/arms")
+async def list_profiling_arms():
+    """残っているプロファイリング予約の一覧"""
+    _require_profiling()
+    return profiler.list_arms()
+
+
+@router.get("/profiling/profiles")
+async def list_profiles():
+    """保存済みプロファイルの一覧（新しい順）"""
+    _require_profiling()
+    return profiler.list_profiles()
+
+
+@router.get("/profiling/profiles/{name}", response_class=PlainTextResponse)
+async def get_profile(name: str):
+    """保存済みプロファイルをfolded形式で取得"""
+    _require_profiling()
+    content = profiler.read_profile(name)
+    if content is None:
+        raise HTTPException(status_code=404, detail=f"Profile {name} not found")
+    return content
+
+
+@router.get("/profiling/hot-stacks", response_class=PlainTextResponse)
+async def get_hot_stacks(limit: Optional[int] = 200):
+    """継続サンプリングで集計したホットスタックをfolded形式で取得"""
+    _require_profiling()
+    stacks = profiler.hot_stacks(limit)
+    if stacks is None:
+        raise HTTPException(status_code=404, detail="Continuous profiling is not running")
+    return format_folded(stacks)
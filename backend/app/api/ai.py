@@ -3,6 +3,9 @@ from fastapi import APIRouter, HTTPException
 
 from app.models.requests import SuggestActionRequest, ActionSuggestion
 from app.services.gemini_service import gemini_service
+from app.core.admission import admission_controller, RESOURCE_LLM
+from app.core.session_manager import session_manager
+from app.core.exceptions import AdmissionRejected, GameSessionNotFound
 
 logger = logging.getLogger(__name__)
 
@@ -21,17 +24,27 @@ async def suggest_action(request: SuggestActionRequest):
         ActionSuggestion: 推奨アクション、理由、フォールバックフラグ
     """
     try:
-        suggestion = await gemini_service.suggest_action(
-            observation=request.observation,
-            available_actions=request.available_actions,
-            score=request.score,
-            user_instruction=request.user_instruction
-        )
+        # 存在しないセッションIDでトークンバケットを使い捨てられないよう、先にセッションを確認
+        if not session_manager.session_exists(request.session_id):
+            raise GameSessionNotFound(f"Session {request.session_id} not found")
+        
+        async with admission_controller.admit(RESOURCE_LLM, request.session_id, request.mode):
+            suggestion = await gemini_service.suggest_action(
+                observation=request.observation,
+                available_actions=request.available_actions,
+                score=request.score,
+                user_instruction=request.user_instruction
+            )
         
         logger.info(f"Action suggested for session: {request.session_id}")
         
         return suggestion
         
+    except GameSessionNotFound as e:
+        logger.warning(f"Session not found: {e}")
+        raise HTTPException(status_code=404, detail=str(e))
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Failed to suggest action: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -1,36 +1,73 @@
+import asyncio
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Union
+from fastapi import APIRouter, HTTPException, Request
 
+from app.config import settings
 from app.models.requests import ResetRequest, StepRequest
-from app.models.game import GameState
+from app.models.game import GameState, CompactGameState
 from app.services.textworld_service import textworld_service
+from app.services.generation_service import generation_service
 from app.core.session_manager import session_manager
-from app.core.exceptions import GameSessionNotFound, TextWorldError, GameNotFoundError
+from app.core.responses import fast_json_response
+from app.core.exceptions import GameSessionNotFound, TextWorldError, GameNotFoundError, AdmissionRejected
+from app.core.admission import admission_controller, RESOURCE_ENGINE
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def _client_key(http_request: Request) -> str:
+    """セッション作成前のレート制限に使うクライアント識別キー（接続元IP）"""
+    host = http_request.client.host if http_request.client is not None else "unknown"
+    
+    if settings.trust_forwarded_for:
+        # 末尾のエントリはフロントエンドが追加したもの（先頭側はクライアントが偽装できる）
+        forwarded = ",".join(http_request.headers.getlist("x-forwarded-for"))
+        hops = [hop.strip() for hop in forwarded.split(",") if hop.strip()]
+        if hops:
+            host = hops[-1]
+    
+    return f"client:{host}"
+
+
 @router.post("/reset", response_model=GameState)
-async def reset_game(request: ResetRequest):
+async def reset_game(request: ResetRequest, http_request: Request):
     """
     新規ゲームセッションを作成し、初期状態を返す
     
     Args:
-        request: ゲームリセットリクエスト（game_id）
+        request: ゲームリセットリクエスト（game_id または difficulty）
     
     Returns:
         GameState: 初期ゲーム状態
     """
     try:
-        # セッションを作成
-        session_id = session_manager.create_session(request.game_id)
-        
-        # ゲームを初期化
-        game_state = textworld_service.initialize_game(session_id, request.game_id)
+        # セッションはまだ存在しないため、接続元単位でアドミッション制御してからゲームを選び、セッションを作成する
+        async with admission_controller.admit(RESOURCE_ENGINE, _client_key(http_request)):
+            # difficulty指定時は事前生成ストックからランダムゲームを取得
+            game_id = request.game_id
+            if request.difficulty is not None:
+                game_id = await generation_service.take_random_game(request.difficulty)
+            
+            # セッション数が上限を超えると休止・削除（ディスク書き込み）が走るためスレッドで実行
+            try:
+                session_id = await asyncio.to_thread(session_manager.create_session, game_id)
+            except BaseException:
+                # セッションが所有する前に失敗した生成ゲームは残さない
+                if request.difficulty is not None:
+                    generation_service.release_game(game_id)
+                raise
+            
+            # ゲームを初期化（失敗時は作成したセッションを残さない。生成ゲームもセッション削除時に解放される）
+            try:
+                game_state = await asyncio.to_thread(textworld_service.initialize_game, session_id, game_id)
+            except BaseException:
+                session_manager.delete_session(session_id)
+                raise
         
-        logger.info(f"Game reset successful: {request.game_id}, session: {session_id}")
+        logger.info(f"Game reset successful: {game_id}, session: {session_id}")
         
         return game_state
         
@@ -40,28 +77,47 @@ async def reset_game(request: ResetRequest):
     except TextWorldError as e:
         logger.error(f"TextWorld error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Failed to reset game: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
-@router.post("/step", response_model=GameState)
+@router.post("/step", response_model=Union[GameState, CompactGameState])
 async def step_game(request: StepRequest):
     """
     指定されたアクションを実行し、結果を返す
     
     Args:
-        request: アクション実行リクエスト（session_id, action）
+        request: アクション実行リクエスト（session_id, action, compact, known_version）
     
     Returns:
         GameState: アクション実行後のゲーム状態
+        CompactGameState: compact指定時は利用可能アクションの差分とバージョン
     """
     try:
-        # アクションを実行
-        game_state = textworld_service.execute_action(
-            request.session_id,
-            request.action
-        )
+        # compactモード: 差分エンコードしてorjsonで直接シリアライズ
+        if request.compact:
+            async with admission_controller.admit(RESOURCE_ENGINE, request.session_id, request.mode):
+                compact_state = await asyncio.to_thread(
+                    textworld_service.execute_action_compact,
+                    request.session_id,
+                    request.action,
+                    known_version=request.known_version
+                )
+            
+            logger.info(f"Action executed (compact): {request.action} in session: {request.session_id}")
+            
+            return fast_json_response(compact_state.model_dump())
+        
+        # アクションを実行（エンジン処理はアドミッション制御下でスレッド実行）
+        async with admission_controller.admit(RESOURCE_ENGINE, request.session_id, request.mode):
+            game_state = await asyncio.to_thread(
+                textworld_service.execute_action,
+                request.session_id,
+                request.action
+            )
         
         logger.info(f"Action executed: {request.action} in session: {request.session_id}")
         
@@ -73,6 +129,8 @@ async def step_game(request: StepRequest):
     except TextWorldError as e:
         logger.error(f"TextWorld error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    except AdmissionRejected:
+        raise
     except Exception as e:
         logger.error(f"Failed to execute action: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -0,0 +1,154 @@
+import json
+import asyncio
+import logging
+from typing import Any, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from app.models.game import GameState
+from app.models.requests import ChannelMessage
+from app.services.textworld_service import textworld_service
+from app.services.gemini_service import gemini_service
+from app.core.session_manager import session_manager, Session
+from app.core.exceptions import GameSessionNotFound, TextWorldError, AdmissionRejected
+from app.core.admission import admission_controller, RESOURCE_ENGINE, RESOURCE_LLM
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# セッションが見つからない場合のクローズコード（アプリケーション定義領域 4000-4999）
+WS_CLOSE_SESSION_NOT_FOUND = 4404
+# アドミッション制御で拒否された場合のクローズコード（Try Again Later）
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+
+async def _send_error(websocket: WebSocket, error: str, detail: str, **extra: Any):
+    """エラーメッセージを送信（HTTPのエラーレスポンスと同じ形式）"""
+    await websocket.send_json({"type": "error", "error": error, "detail": detail, **extra})
+
+
+async def _send_rejected(websocket: WebSocket, exc: AdmissionRejected):
+    """アドミッション制御による拒否を送信（HTTPの429に相当）"""
+    await _send_error(websocket, "Too many requests", str(exc), retry_after=exc.retry_after)
+
+
+async def _push_suggestion(
+    websocket: WebSocket,
+    state: GameState,
+    mode: str,
+    user_instruction: Optional[str] = None
+) -> bool:
+    """現在の状態に対するAI推奨アクションをプッシュ（提案できない状態ならFalse）"""
+    if state.done or not state.available_actions:
+        return False
+    
+    async with admission_controller.admit(RESOURCE_LLM, state.session_id, mode):
+        suggestion = await gemini_service.suggest_action(
+            observation=state.observation,
+            available_actions=state.available_actions,
+            score=state.score,
+            user_instruction=user_instruction
+        )
+    await websocket.send_json({"type": "suggestion", "data": suggestion.model_dump()})
+    return True
+
+
+@router.websocket("/ws/{session_id}")
+async def game_channel(websocket: WebSocket, session_id: str):
+    """
+    セッション単位の永続ゲームチャネル
+    
+    クライアント → サーバー:
+        {"type": "action", "action": "go north", "suggest": true}
+        {"type": "suggest", "user_instruction": "..."}
+    
+    サーバー → クライアント:
+        {"type": "state", "data": GameState}
+        {"type": "suggestion", "data": ActionSuggestion}
+        {"type": "error", "error": "...", "detail": "..."}
+    
+    セッションの検索は接続時に1回だけ行い、以降のアクションはバインド済みのセッションに対して実行する。
+    """
+    await websocket.accept()
+    
+    try:
+        if not session_manager.session_exists(session_id):
+            raise GameSessionNotFound(f"Session {session_id} not found")
+        
+        # 休止中のセッションはディスクからの読み込みとリプレイを伴うため、
+        # アドミッション制御下でスレッド実行する
+        async with admission_controller.admit(RESOURCE_ENGINE, session_id):
+            session: Session = await asyncio.to_thread(session_manager.bind_socket, session_id, websocket)
+    except GameSessionNotFound as e:
+        logger.warning(f"Session not found: {e}")
+        await _send_error(websocket, "Session not found", str(e))
+        await websocket.close(code=WS_CLOSE_SESSION_NOT_FOUND)
+        return
+    except AdmissionRejected as e:
+        await _send_rejected(websocket, e)
+        await websocket.close(code=WS_CLOSE_TRY_AGAIN_LATER)
+        return
+    
+    try:
+        while True:
+            try:
+                payload = await websocket.receive_json()
+            except (json.JSONDecodeError, KeyError, TypeError) as e:
+                # JSONでないテキストフレームやバイナリフレームは接続を切らずにエラーを返す
+                await _send_error(websocket, "Invalid message", f"Message must be a JSON text frame: {e}")
+                continue
+            
+            try:
+                message = ChannelMessage.model_validate(payload)
+            except ValidationError as e:
+                await _send_error(websocket, "Invalid message", str(e))
+                continue
+            
+            if message.type == "suggest":
+                try:
+                    # HTTPの/stepや別の接続で進んでいる場合もあるため、毎回セッションの現在の状態を使う
+                    state = textworld_service.get_session_state(session)
+                except TextWorldError as e:
+                    await _send_error(websocket, "Game engine error", str(e))
+                    continue
+                try:
+                    if not await _push_suggestion(websocket, state, message.mode, message.user_instruction):
+                        await _send_error(websocket, "Invalid action", "No available actions to suggest from")
+                except AdmissionRejected as e:
+                    await _send_rejected(websocket, e)
+                continue
+            
+            if not message.action:
+                await _send_error(websocket, "Invalid action", "action is required")
+                continue
+            
+            try:
+                async with admission_controller.admit(RESOURCE_ENGINE, session_id, message.mode):
+                    state = await asyncio.to_thread(
+                        textworld_service.execute_action_on_session, session, message.action
+                    )
+            except AdmissionRejected as e:
+                await _send_rejected(websocket, e)
+                continue
+            except TextWorldError as e:
+                logger.error(f"TextWorld error: {e}")
+                await _send_error(websocket, "Game engine error", str(e))
+                continue
+            
+            logger.info(f"Action executed: {message.action} in session: {session_id} (ws)")
+            
+            await websocket.send_json({"type": "state", "data": state.model_dump()})
+            
+            if message.suggest:
+                try:
+                    await _push_suggestion(websocket, state, message.mode, message.user_instruction)
+                except AdmissionRejected as e:
+                    # 状態は送信済みのため、推奨アクションの拒否は通知のみ
+                    logger.info(f"Pushed suggestion rejected for session {session_id}: {e}")
+    
+    except WebSocketDisconnect:
+        logger.info(f"WebSocket disconnected: {session_id}")
+    finally:
+        session_manager.unbind_socket(session_id, websocket)
@@ -44,14 +44,68 @@ class Settings(BaseSettings):
         
         return origins
     
+    # レスポンス圧縮（GZip、Accept-Encodingに応じて適用）
+    response_compression: bool = False
+    compression_minimum_size: int = 1000  # バイト
+    
+    # アドミッション制御（セッション単位のレート制限と公平キュー）
+    admission_enabled: bool = True
+    session_rate_per_second: float = 2.0  # トークン補充レート
+    session_burst: int = 10  # トークンバケット容量
+    llm_concurrency: int = 4  # Gemini API同時呼び出し数
+    engine_concurrency: int = 1  # ゲームエンジン同時実行数
+    admission_max_queue: int = 50  # 超過時は429
+    manual_weight: int = 4  # 手動モードの優先度（重み）
+    auto_weight: int = 1  # 自動モードの優先度（重み）
+    # /reset のレート制限キーにX-Forwarded-Forの末尾（フロントエンドが追加した接続元IP）を使うか
+    # クライアントが付けた値は先頭側に残るため末尾のみを信頼する（Cloud Runなどプロキシ配下でのみ有効にする）
+    trust_forwarded_for: bool = False
+    
+    # プロファイリング（本番でも無効がデフォルト、有効時のみミドルウェアを登録）
+    profiling_enabled: bool = False
+    profiling_output_dir: str = "profiles"
+    profiling_interval_ms: float = 5.0  # オンデマンドプロファイルのサンプリング間隔
+    profiling_header_enabled: bool = False  # X-Profileヘッダーによる指定を受け付けるか（無効時はarmのみ）
+    profiling_max_files: int = 100  # 保持するプロファイル数の上限（古いものから削除）
+    profiling_continuous: bool = False  # 全リクエストを対象とした継続サンプリング
+    profiling_continuous_interval_ms: float = 50.0
+    profiling_max_stacks: int = 5000  # 継続サンプリングで保持するスタック数の上限
+    
     # セッション
     session_timeout: int = 3600  # 秒
     max_sessions: int = 100
+    intern_pool_max_entries: int = 10000  # ゲームごとの共有テキスト数の上限
+    memory_report_enabled: bool = False  # /admin/memory を有効にするか（セッションIDの一部を含む）
+    
+    # セッション休止（アイドルセッションをディスクに退避し、ゲーム環境を解放）
+    hibernation_enabled: bool = True
+    hibernate_after: int = 300  # 秒（この時間アクセスがなければ休止）
+    hibernation_check_interval: int = 60  # 秒
+    hibernation_directory: str = "sessions"
+    hibernated_session_timeout: int = 7 * 24 * 3600  # 秒（休止セッションの保持期間）
+    action_log_max_entries: int = 1000  # 復元用のアクション履歴の上限（超えたセッションは休止しない）
     
     # TextWorld
     games_directory: str = "games"
     default_max_steps: int = 100
     
+    # プロシージャル生成ゲーム
+    generated_games_directory: str = "games/generated"
+    generation_workers: int = 2
+    pregenerated_stock_size: int = 2  # 難易度ごとの事前生成数（0で無効）
+    
+    # 起動時ウォームアップ（Cloud Runのコールドスタート対策）
+    warmup_on_startup: bool = True
+    warmup_games: List[str] = ["simple_game"]
+    
+    @field_validator("warmup_games", mode="before")
+    @classmethod
+    def parse_warmup_games(cls, v):
+        """ウォームアップ対象ゲームをパース（カンマ区切りの環境変数に対応）"""
+        if isinstance(v, str):
+            return [game_id.strip() for game_id in v.split(",") if game_id.strip()]
+        return v
+    
     class Config:
         # ルートディレクトリとbackendディレクトリの両方から.env.localを探す
         env_file = ("../.env.local", ".env.local", ".env")
@@ -0,0 +1,282 @@
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List
+
+from app.config import settings
+from app.core.exceptions import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+# リソース種別
+RESOURCE_LLM = "llm"
+RESOURCE_ENGINE = "engine"
+
+# プレイモード（重み付き公平キューのクラス）
+MODE_MANUAL = "manual"
+MODE_AUTO = "auto"
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """パーセンタイル（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+def _to_ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class TokenBucket:
+    """セッション単位のトークンバケット"""
+    
+    __slots__ = ("rate", "capacity", "tokens", "updated_at")
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+    
+    def try_consume(self, cost: float = 1.0) -> float:
+        """
+        トークンを消費
+        
+        Returns:
+            float: 成功時は0、不足時は次に消費可能になるまでの秒数
+        """
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+    
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class WeightedFairQueue:
+    """
+    同時実行数を制限し、待機中のリクエストをモード別の重みで公平に割り当てるキュー
+    
+    ストライドスケジューリング: 各モードの仮想終了時刻が最も小さいキューから取り出し、
+    取り出すたびに仮想時刻を 1/重み だけ進める（重みが大きいほど優先される）。
+    """
+    
+    def __init__(self, name: str, concurrency: int, weights: Dict[str, int], max_queue: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.weights = weights
+        self.max_queue = max_queue
+        
+        self.active = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {mode: deque() for mode in weights}
+        self._pass: Dict[str, float] = {mode: 0.0 for mode in weights}
+        
+        # メトリクス
+        self.admitted: Dict[str, int] = {mode: 0 for mode in weights}
+        self.shed = 0
+        self._wait_times: Dict[str, Deque[float]] = {mode: deque(maxlen=1000) for mode in weights}
+    
+    @property
+    def depth(self) -> int:
+        """待機中のリクエスト数"""
+        return sum(len(waiters) for waiters in self._waiters.values())
+    
+    def _estimate_retry_after(self) -> float:
+        """キューが空くまでの目安秒数（直近の待ち時間の平均、最低1秒）"""
+        recent = [w for waits in self._wait_times.values() for w in waits]
+        return max(1.0, sum(recent) / len(recent)) if recent else 1.0
+    
+    async def acquire(self, mode: str):
+        """実行枠を取得（空きがなければ待機、キューが上限なら拒否）"""
+        started = time.monotonic()
+        
+        if self.active < self.concurrency and self.depth == 0:
+            self.active += 1
+        else:
+            if self.depth >= self.max_queue:
+                self.shed += 1
+                raise AdmissionRejected(
+                    f"{self.name} queue is full ({self.depth} waiting)",
+                    retry_after=self._estimate_retry_after()
+                )
+            
+            # 待機開始時、他に待ちのないモードの仮想時刻を現在の最小値に揃える（溜め込み防止）
+            waiters = self._waiters[mode]
+            if not waiters:
+                busy = [self._pass[m] for m, w in self._waiters.items() if w]
+                if busy:
+                    self._pass[mode] = max(self._pass[mode], min(busy))
+            
+            future = asyncio.get_running_loop().create_future()
+            waiters.append(future)
+            try:
+                await future
+            except asyncio.CancelledError:
+                if future in waiters:
+                    waiters.remove(future)
+                elif future.done() and not future.cancelled():
+                    # 枠を割り当てられた直後にキャンセルされた場合は次に回す
+                    self.release()
+                raise
+        
+        wait_time = time.monotonic() - started
+        self.admitted[mode] += 1
+        self._wait_times[mode].append(wait_time)
+    
+    def release(self):
+        """実行枠を返却し、次の待機者に割り当て"""
+        while True:
+            candidates = [mode for mode, waiters in self._waiters.items() if waiters]
+            if not candidates:
+                self.active -= 1
+                return
+            
+            # 仮想終了時刻（現在の仮想時刻 + 1/重み）が最小のモードを選ぶ
+            mode = min(candidates, key=lambda m: self._pass[m] + 1.0 / self.weights[m])
+            future = self._waiters[mode].popleft()
+            if future.done():
+                # キャンセル済みの待機者は飛ばす
+                continue
+            
+            # 実行枠はそのまま次の待機者に引き継ぐ
+            self._pass[mode] += 1.0 / self.weights[mode]
+            future.set_result(None)
+            return
+    
+    def metrics(self) -> Dict:
+        """キューの深さと待ち時間のメトリクス"""
+        wait_stats = {}
+        for mode, waits in self._wait_times.items():
+            wait_stats[mode] = {
+                "queued": len(self._waiters[mode]),
+                "admitted": self.admitted[mode],
+                "wait_avg_ms": _to_ms(sum(waits) / len(waits)) if waits else 0.0,
+                "wait_p95_ms": _to_ms(_percentile(list(waits), 0.95)),
+                "wait_max_ms": _to_ms(max(waits)) if waits else 0.0,
+            }
+        
+        return {
+            "concurrency": self.concurrency,
+            "active": self.active,
+            "depth": self.depth,
+            "max_queue": self.max_queue,
+            "shed": self.shed,
+            "modes": wait_stats,
+        }
+
+
+class AdmissionController:
+    """LLM・ゲームエンジンの容量に対するアドミッション制御（シングルトン）"""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._init()
+        return cls._instance
+    
+    def _init(self):
+        weights = {MODE_MANUAL: settings.manual_weight, MODE_AUTO: settings.auto_weight}
+        self._queues: Dict[str, WeightedFairQueue] = {
+            RESOURCE_LLM: WeightedFairQueue(
+                RESOURCE_LLM, settings.llm_concurrency, weights, settings.admission_max_queue
+            ),
+            RESOURCE_ENGINE: WeightedFairQueue(
+                RESOURCE_ENGINE, settings.engine_concurrency, weights, settings.admission_max_queue
+            ),
+        }
+        # 最近使われた順に保持し、上限を超えたら最も古いものから破棄（LRU）
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._throttled = 0
+        # 同一セッションのエンジン操作は直列化する（環境はスレッドセーフでない）
+        # セッションID -> [ロック, 参照数]
+        self._session_locks: Dict[str, list] = {}
+    
+    def _get_bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            self._buckets.move_to_end(key)
+            return bucket
+        
+        bucket = TokenBucket(settings.session_rate_per_second, settings.session_burst)
+        self._buckets[key] = bucket
+        while len(self._buckets) > settings.max_sessions * 2:
+            self._buckets.popitem(last=False)
+        return bucket
+    
+    @asynccontextmanager
+    async def admit(self, resource: str, session_id: str, mode: str = MODE_MANUAL):
+        """
+        リソースの利用を許可
+        
+        Args:
+            resource: リソース種別（llm / engine）
+            session_id: セッションID（トークンバケットの単位）
+            mode: プレイモード（manual / auto）
+        
+        Raises:
+            AdmissionRejected: レート超過またはキューが上限に達した場合
+        """
+        if not settings.admission_enabled:
+            yield
+            return
+        
+        if mode not in (MODE_MANUAL, MODE_AUTO):
+            mode = MODE_MANUAL
+        
+        retry_after = self._get_bucket(session_id).try_consume()
+        if retry_after > 0:
+            self._throttled += 1
+            raise AdmissionRejected(f"Rate limit exceeded for session {session_id}", retry_after=retry_after)
+        
+        entry = None
+        if resource == RESOURCE_ENGINE:
+            entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+            entry[1] += 1
+        
+        queue = self._queues[resource]
+        try:
+            if entry is not None:
+                await entry[0].acquire()
+            try:
+                await queue.acquire(mode)
+                try:
+                    yield
+                finally:
+                    queue.release()
+            finally:
+                if entry is not None:
+                    entry[0].release()
+        finally:
+            if entry is not None:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[session_id]
+    
+    def metrics(self) -> Dict:
+        """アドミッション制御のメトリクス"""
+        return {
+            "enabled": settings.admission_enabled,
+            "throttled": self._throttled,
+            "tracked_sessions": len(self._buckets),
+            "queues": {name: queue.metrics() for name, queue in self._queues.items()},
+        }
+
+
+# シングルトンインスタンス
+admission_controller = AdmissionController()
@@ -22,3 +22,11 @@ class GameNotFoundError(Exception):
     """ゲームファイルが見つからない"""
     pass
 
+
+
+class AdmissionRejected(Exception):
+    """アドミッション制御による拒否（レート超過・キュー超過）"""
+    
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
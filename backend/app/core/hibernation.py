@@ -0,0 +1,90 @@
+import os
+import time
+import zlib
+import pickle
+import logging
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HibernationStore:
+    """
+    休止セッションのファイルストア
+    
+    セッションごとに1ファイル（pickle + zlib圧縮）で保存する。
+    書き込むのはこのプロセス自身のみで、外部からの入力は読み込まない。
+    """
+    
+    def __init__(self, directory: str):
+        self.directory = directory
+    
+    def _path(self, session_id: str) -> str:
+        # セッションIDはuuid4だが、念のためパス区切りを含むIDは拒否
+        if os.path.basename(session_id) != session_id:
+            raise ValueError(f"Invalid session id: {session_id}")
+        return os.path.join(self.directory, f"{session_id}.bin")
+    
+    def save(self, session_id: str, payload: Dict[str, Any]) -> int:
+        """
+        セッションを保存（一時ファイル経由で置き換え）
+        
+        Returns:
+            int: 書き込んだバイト数
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        data = zlib.compress(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))
+        
+        path = self._path(session_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        
+        return len(data)
+    
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """セッションを読み込み（存在しなければNone）"""
+        try:
+            path = self._path(session_id)
+            with open(path, "rb") as f:
+                return pickle.loads(zlib.decompress(f.read()))
+        except (ValueError, FileNotFoundError):
+            return None
+    
+    def delete(self, session_id: str):
+        """保存されたセッションを削除"""
+        try:
+            os.remove(self._path(session_id))
+        except (ValueError, FileNotFoundError):
+            pass
+    
+    def exists(self, session_id: str) -> bool:
+        """セッションが保存されているか"""
+        try:
+            return os.path.exists(self._path(session_id))
+        except ValueError:
+            return False
+    
+    def count(self) -> int:
+        """保存されているセッション数"""
+        if not os.path.isdir(self.directory):
+            return 0
+        return sum(1 for name in os.listdir(self.directory) if name.endswith(".bin"))
+    
+    def expired(self, max_age: int) -> List[str]:
+        """最終更新から max_age 秒を超えたセッションIDの一覧"""
+        if not os.path.isdir(self.directory):
+            return []
+        
+        now = time.time()
+        return [
+            name[:-len(".bin")] for name in os.listdir(self.directory)
+            if name.endswith(".bin") and now - os.path.getmtime(os.path.join(self.directory, name)) > max_age
+        ]
+
+
+# シングルトンインスタンス
+hibernation_store = HibernationStore(settings.hibernation_directory)
@@ -0,0 +1,96 @@
+import sys
+import logging
+from typing import Dict, Iterable, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class InternPool:
+    """
+    ゲーム単位のテキスト共有プール
+    
+    同じゲームのセッション間で同一の観察テキスト・アクション一覧を1つのオブジェクトとして共有する。
+    アクション一覧は不変のタプルとして保持する。
+    """
+    
+    __slots__ = ("game_id", "max_entries", "_texts", "_actions", "hits", "misses")
+    
+    def __init__(self, game_id: str, max_entries: int):
+        self.game_id = game_id
+        self.max_entries = max_entries
+        self._texts: Dict[str, str] = {}
+        self._actions: Dict[Tuple[str, ...], Tuple[str, ...]] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def intern_text(self, text: str) -> str:
+        """テキストを共有オブジェクトに置き換え"""
+        shared = self._texts.get(text)
+        if shared is not None:
+            self.hits += 1
+            return shared
+        
+        self.misses += 1
+        # 上限を超えたら共有せずそのまま返す（動的なテキストでプールが膨らむのを防ぐ）
+        if len(self._texts) >= self.max_entries:
+            return text
+        return self._texts.setdefault(text, text)
+    
+    def intern_actions(self, actions: Iterable[str]) -> Tuple[str, ...]:
+        """アクション一覧を共有タプルに置き換え"""
+        key = tuple(actions)
+        shared = self._actions.get(key)
+        if shared is not None:
+            self.hits += 1
+            return shared
+        
+        self.misses += 1
+        if len(self._actions) >= self.max_entries:
+            return key
+        # 個々のアクション文字列も共有する
+        return self._actions.setdefault(key, tuple(self.intern_text(a) for a in key))
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """プールが保持しているオブジェクトのバイト数"""
+        text_bytes = sum(sys.getsizeof(t) for t in self._texts)
+        action_bytes = sum(sys.getsizeof(a) for a in self._actions)
+        return {
+            "texts": len(self._texts),
+            "action_lists": len(self._actions),
+            "bytes": text_bytes + action_bytes + sys.getsizeof(self._texts) + sys.getsizeof(self._actions),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class InternPoolRegistry:
+    """ゲームIDごとのInternPoolの管理（シングルトン）"""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._pools: Dict[str, InternPool] = {}
+        return cls._instance
+    
+    def get(self, game_id: str) -> InternPool:
+        """ゲームのプールを取得（なければ作成）"""
+        pool = self._pools.get(game_id)
+        if pool is None:
+            pool = self._pools.setdefault(game_id, InternPool(game_id, settings.intern_pool_max_entries))
+        return pool
+    
+    def discard(self, game_id: str):
+        """ゲームのプールを破棄（生成ゲームの削除時）"""
+        self._pools.pop(game_id, None)
+    
+    def report(self) -> Dict[str, Dict[str, int]]:
+        """ゲームごとのプールのメモリ使用量"""
+        return {game_id: pool.memory_usage() for game_id, pool in self._pools.items()}
+
+
+# シングルトンインスタンス
+intern_pools = InternPoolRegistry()
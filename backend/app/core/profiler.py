@@ -0,0 +1,260 @@
+import os
+import sys
+import time
+import uuid
+import logging
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import Request
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# プロファイル対象を指定するリクエストヘッダー
+PROFILE_HEADER = "x-profile"
+
+# 待機中のスレッドの末端フレーム（ファイル名, 関数名）
+# イベントループのselect、to_thread/プロセスプールの待機中ワーカーなどはサンプルから除外する
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("connection.py", "wait"),
+}
+
+
+def _frame_label(frame) -> str:
+    """フレームを「関数名 (ファイル名:行)」形式に変換"""
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    """末端フレームが待機中（I/O待ち・キュー待ち）か"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+def _fold_stack(frame) -> str:
+    """スタックをflamegraph用のfolded形式（root;...;leaf）に変換"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    """
+    全スレッドのスタックを一定間隔でサンプリングするプロファイラ
+    
+    cProfileと違い計測対象のコードに手を入れず、TextWorld/Jerichoのスレッドや
+    Gemini SDKの呼び出し中のスタックもまとめて取得できる。
+    待機中のスレッド（IDLE_FRAMES）は集計せず、idle_samplesとして数だけ数える。
+    """
+    
+    def __init__(self, interval: float, max_stacks: int = 0):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.counts: Counter = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+    
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> Counter:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.counts
+    
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    if _is_idle(frame):
+                        self.idle_samples += 1
+                        continue
+                    self.counts[_fold_stack(frame)] += 1
+                self.samples += 1
+                
+                # 集計が大きくなりすぎたら出現頻度の低いスタックを捨てる
+                if self.max_stacks and len(self.counts) > self.max_stacks:
+                    self.counts = Counter(dict(self.counts.most_common(self.max_stacks // 2)))
+    
+    def snapshot(self, limit: Optional[int] = None) -> List[tuple]:
+        """出現頻度の高い順にスタックを取得"""
+        with self._lock:
+            return self.counts.most_common(limit)
+
+
+def format_folded(stacks: List[tuple]) -> str:
+    """folded形式のテキストに変換（flamegraph.pl / speedscope で読み込み可能）"""
+    return "\n".join(f"{stack} {count}" for stack, count in stacks) + "\n"
+
+
+class ProfilerRegistry:
+    """オンデマンド・継続プロファイリングの管理（シングルトン）"""
+    
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._arms: List[Dict] = []
+            cls._instance._continuous: Optional[StackSampler] = None
+        return cls._instance
+    
+    @property
+    def output_dir(self) -> str:
+        return settings.profiling_output_dir
+    
+    def arm(self, count: int, route: Optional[str] = None, session_id: Optional[str] = None) -> Dict:
+        """次のN件の対象リクエストをプロファイルするよう設定"""
+        arm = {"id": uuid.uuid4().hex[:8], "remaining": count, "route": route, "session_id": session_id}
+        self._arms.append(arm)
+        logger.info(f"Profiling armed: {arm}")
+        return dict(arm)
+    
+    def list_arms(self) -> List[Dict]:
+        return [dict(arm) for arm in self._arms]
+    
+    def _needs_body(self, request: Request) -> bool:
+        """セッション指定の予約があり、ボディを確認する必要があるか"""
+        return request.method == "POST" and any(
+            arm["session_id"] and (arm["route"] in (None, request.url.path))
+            for arm in self._arms
+        )
+    
+    async def _take_arm(self, request: Request) -> bool:
+        """リクエストが予約に一致すれば残り回数を1つ消費"""
+        # 管理用エンドポイント自体は予約の対象外
+        if not self._arms or request.url.path.startswith("/admin"):
+            return False
+        
+        session_id = request.path_params.get("session_id")
+        if session_id is None and self._needs_body(request):
+            try:
+                session_id = (await request.json()).get("session_id")
+            except Exception:
+                session_id = None
+        
+        for arm in self._arms:
+            if arm["route"] is not None and arm["route"] != request.url.path:
+                continue
+            if arm["session_id"] is not None and arm["session_id"] != session_id:
+                continue
+            
+            arm["remaining"] -= 1
+            if arm["remaining"] <= 0:
+                self._arms.remove(arm)
+            return True
+        
+        return False
+    
+    def _save(self, request: Request, sampler: StackSampler, elapsed: float) -> str:
+        """プロファイル結果をfolded形式で保存"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        route = request.url.path.strip("/").replace("/", "_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{route}_{uuid.uuid4().hex[:6]}.folded"
+        path = os.path.join(self.output_dir, name)
+        
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(format_folded(sampler.snapshot()))
+        
+        logger.info(f"Profile saved: {path} ({elapsed * 1000:.0f}ms, {sampler.samples} samples)")
+        
+        self._prune()
+        
+        return name
+    
+    def _prune(self):
+        """保存数の上限を超えた古いプロファイルを削除"""
+        for name in self.list_profiles()[settings.profiling_max_files:]:
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError as e:
+                logger.warning(f"Failed to remove profile {name}: {e}")
+    
+    def list_profiles(self) -> List[str]:
+        """保存済みプロファイルの一覧（新しい順）"""
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted((f for f in os.listdir(self.output_dir) if f.endswith(".folded")), reverse=True)
+    
+    def read_profile(self, name: str) -> Optional[str]:
+        """保存済みプロファイルを読み込み（ディレクトリ外は参照しない）"""
+        if os.path.basename(name) != name or name not in self.list_profiles():
+            return None
+        with open(os.path.join(self.output_dir, name), encoding="utf-8") as f:
+            return f.read()
+    
+    def start_continuous(self):
+        """低頻度の継続サンプリングを開始"""
+        if self._continuous is not None:
+            return
+        self._continuous = StackSampler(
+            settings.profiling_continuous_interval_ms / 1000,
+            max_stacks=settings.profiling_max_stacks
+        )
+        self._continuous.start()
+        logger.info(f"Continuous profiling started (interval: {settings.profiling_continuous_interval_ms}ms)")
+    
+    def stop_continuous(self):
+        if self._continuous is not None:
+            self._continuous.stop()
+            self._continuous = None
+    
+    def hot_stacks(self, limit: Optional[int] = None) -> Optional[List[tuple]]:
+        """継続サンプリングで集計したホットスタック（無効時はNone）"""
+        if self._continuous is None:
+            return None
+        return self._continuous.snapshot(limit)
+    
+    async def middleware(self, request: Request, call_next):
+        """
+        プロファイル対象のリクエストをサンプリングするHTTPミドルウェア
+        
+        対象: arm() で予約されたルート/セッション、
+        または PROFILING_HEADER_ENABLED 時のみ X-Profile ヘッダー付きのリクエスト
+        """
+        profile = settings.profiling_header_enabled and (
+            request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true")
+        )
+        if not profile:
+            profile = await self._take_arm(request)
+        
+        if not profile:
+            return await call_next(request)
+        
+        sampler = StackSampler(settings.profiling_interval_ms / 1000)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            sampler.stop()
+        
+        name = self._save(request, sampler, time.perf_counter() - started)
+        response.headers["X-Profile-Id"] = name
+        
+        return response
+
+
+# シングルトンインスタンス
+profiler = ProfilerRegistry()
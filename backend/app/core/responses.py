@@ -0,0 +1,31 @@
+import logging
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# orjsonはオプション依存（未インストール時は標準のJSONResponseを使用）
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+    ORJSON_AVAILABLE = True
+except ImportError:
+    FastJSONResponse = JSONResponse
+    ORJSON_AVAILABLE = False
+
+
+def fast_json_response(content: Any, status_code: int = 200) -> JSONResponse:
+    """
+    高速シリアライズのJSONレスポンスを生成
+    
+    Pydanticのレスポンスモデル検証を経由せず、orjsonで直接シリアライズする。
+    
+    Args:
+        content: シリアライズ済みの辞書（model_dump()の結果など）
+        status_code: HTTPステータスコード
+    
+    Returns:
+        JSONResponse: orjsonが利用可能ならORJSONResponse
+    """
+    return FastJSONResponse(content=content, status_code=status_code)
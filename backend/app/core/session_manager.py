@@ -1,13 +1,138 @@
+import sys
 import uuid
+import asyncio
 import logging
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from app.core.exceptions import GameSessionNotFound
+from app.core.intern_pool import intern_pools
+from app.core.hibernation import hibernation_store
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+class Session:
+    """
+    セッションレコード
+    
+    返却に必要なフィールドのみを保持する。観察テキストとアクション一覧は
+    ゲーム単位のInternPoolで共有されたオブジェクトを参照する。
+    """
+    
+    __slots__ = (
+        "session_id",
+        "game_id",
+        "created_at",
+        "last_accessed",
+        "game_env",  # TextWorldのゲーム環境
+        "seed",  # ゲーム環境の乱数シード（休止からのリプレイを再現可能にする）
+        "current_step",
+        "state_version",  # 状態バージョン（差分レスポンス用）
+        "observation",
+        "available_actions",
+        "score",
+        "done",
+        "won",
+        "action_log",  # 実行したアクション（休止からの復元用、上限超過でNone）
+        "hibernated",  # ゲーム環境を解放してディスクに退避済みか
+        "in_flight",  # 実行中のエンジン処理数（0より大きい間は休止しない）
+        "websocket",  # バインドされたWebSocket接続
+    )
+    
+    # 休止時にディスクへ保存するフィールド
+    SNAPSHOT_FIELDS = (
+        "session_id",
+        "game_id",
+        "created_at",
+        "last_accessed",
+        "seed",
+        "current_step",
+        "state_version",
+        "observation",
+        "available_actions",
+        "score",
+        "done",
+        "won",
+        "action_log",
+    )
+    
+    def __init__(self, session_id: str, game_id: str):
+        now = datetime.now()
+        self.session_id = session_id
+        self.game_id = game_id
+        self.created_at = now
+        self.last_accessed = now
+        self.game_env: Optional[Any] = None
+        self.seed: Optional[int] = None
+        self.current_step = 0
+        self.state_version = 0
+        self.observation = ""
+        self.available_actions: Tuple[str, ...] = ()
+        self.score = 0
+        self.done = False
+        self.won = False
+        self.action_log: Optional[List[str]] = []
+        self.hibernated = False
+        self.in_flight = 0
+        self.websocket: Optional[Any] = None
+    
+    def to_snapshot(self) -> Dict[str, Any]:
+        """休止用のスナップショット（ゲーム環境と接続は含まない）"""
+        return {name: getattr(self, name) for name in self.SNAPSHOT_FIELDS}
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, Any]) -> "Session":
+        """スナップショットからセッションを復元（テキストはInternPoolで共有し直す）"""
+        session = cls(snapshot["session_id"], snapshot["game_id"])
+        for name in cls.SNAPSHOT_FIELDS:
+            setattr(session, name, snapshot[name])
+        
+        pool = intern_pools.get(session.game_id)
+        session.observation = pool.intern_text(session.observation)
+        session.available_actions = pool.intern_actions(session.available_actions)
+        session.action_log = [pool.intern_text(action) for action in session.action_log]
+        return session
+    
+    def record_action(self, action: str):
+        """
+        実行したアクションを履歴に追加
+        
+        アクション文字列はInternPoolで利用可能アクションと共有する。
+        履歴が上限を超えたセッションはリプレイできないため履歴を破棄し、以降は休止しない。
+        """
+        if self.action_log is None:
+            return
+        
+        if len(self.action_log) >= settings.action_log_max_entries:
+            self.action_log = None
+            logger.info(f"Action log limit reached for session {self.session_id}, hibernation disabled")
+            return
+        
+        self.action_log.append(intern_pools.get(self.game_id).intern_text(action))
+    
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        セッションのメモリ使用量（バイト）
+        
+        own: このセッション固有のオブジェクト
+        shared: InternPoolで他セッションと共有されうるオブジェクト（参考値）
+        
+        アクション履歴は共有されている文字列も含めて own に数える（上限側の見積もり）。
+        ゲーム環境（game_env）は含まない。
+        """
+        own = sum(sys.getsizeof(value) for value in (
+            self, self.session_id, self.game_id, self.created_at, self.last_accessed, self.action_log
+        ))
+        if self.action_log:
+            # 同じ文字列オブジェクトは1回だけ数える
+            own += sum(sys.getsizeof(action) for action in {id(a): a for a in self.action_log}.values())
+        shared = sys.getsizeof(self.observation) + sys.getsizeof(self.available_actions)
+        return {"own": own, "shared": shared}
+
+
 class SessionManager:
     """セッション管理クラス（シングルトン）"""
     
@@ -16,53 +141,161 @@ class SessionManager:
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
-            cls._instance._sessions: Dict[str, Dict[str, Any]] = {}
+            cls._instance._sessions: Dict[str, Session] = {}
+            # _sessions の変更のみを保護する（ディスクI/Oやリプレイ中は保持しない）
+            cls._instance._lock = threading.Lock()
+            # セッション単位の休止・復元用ロック（セッションID -> [ロック, 参照数]）
+            # 休止・復元はバックグラウンドとエンジンのワーカースレッドの両方から呼ばれる
+            cls._instance._session_locks: Dict[str, list] = {}
+            cls._instance._restore_env: Optional[Callable[[Session], None]] = None
+            cls._instance._end_handlers: List[Callable[[str], None]] = []
         return cls._instance
     
+    def register_env_handler(self, restore: Callable[[Session], None]):
+        """
+        ゲーム環境の復元処理を登録（TextWorldServiceから登録される）
+        
+        Args:
+            restore: セッションのアクション履歴からゲーム環境を作り直す
+        """
+        self._restore_env = restore
+    
+    def register_end_handler(self, handler: Callable[[str], None]):
+        """
+        セッション終了時の処理を登録（GenerationServiceから登録される）
+        
+        Args:
+            handler: 終了したセッションのゲームIDを受け取る
+        """
+        self._end_handlers.append(handler)
+    
+    def _notify_end(self, game_id: str):
+        """セッション終了時の処理を呼び出し"""
+        for handler in self._end_handlers:
+            try:
+                handler(game_id)
+            except Exception as e:
+                logger.warning(f"Session end handler failed for game {game_id}: {e}")
+    
+    @contextmanager
+    def _session_lock(self, session_id: str):
+        """
+        セッション単位のロック（休止・復元・処理中カウントの更新を直列化）
+        
+        他のセッションの休止・復元（ディスクI/Oやリプレイ）を待たずに済むよう、セッションごとに分ける。
+        """
+        with self._lock:
+            entry = self._session_locks.setdefault(session_id, [threading.RLock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._session_locks[session_id]
+    
     def create_session(self, game_id: str) -> str:
         """新規セッションを作成"""
         session_id = str(uuid.uuid4())
-        now = datetime.now()
         
-        self._sessions[session_id] = {
-            "session_id": session_id,
-            "game_id": game_id,
-            "created_at": now,
-            "last_accessed": now,
-            "game_env": None,  # TextWorldのゲーム環境
-            "game_state": None,  # 現在のゲーム状態
-            "current_step": 0,
-            "history": []
-        }
+        with self._lock:
+            self._sessions[session_id] = Session(session_id, game_id)
         
         logger.info(f"Session created: {session_id} for game: {game_id}")
         
         # セッション数制限チェック
         if len(self._sessions) > settings.max_sessions:
+            if settings.hibernation_enabled:
+                self.hibernate_idle_sessions()
             self.cleanup_old_sessions()
         
         return session_id
     
-    def get_session(self, session_id: str) -> Dict[str, Any]:
+    def get_session(self, session_id: str) -> Session:
         """セッションを取得"""
-        if session_id not in self._sessions:
-            raise GameSessionNotFound(f"Session {session_id} not found")
+        session = self._sessions.get(session_id)
+        if session is None:
+            # 休止中のセッションならディスクから復元
+            session = self._rehydrate(session_id)
+            if session is None:
+                raise GameSessionNotFound(f"Session {session_id} not found")
+        elif session.hibernated:
+            self.ensure_env(session)
         
         # 最終アクセス時刻を更新
-        self._sessions[session_id]["last_accessed"] = datetime.now()
+        session.last_accessed = datetime.now()
+        
+        return session
+    
+    @contextmanager
+    def in_use(self, session: Session):
+        """
+        エンジン処理中のセッションを休止の対象から外す
         
-        return self._sessions[session_id]
+        開始時と終了時に最終アクセス時刻を更新するため、長い処理の直後に休止されることもない。
+        """
+        with self._session_lock(session.session_id):
+            session.in_flight += 1
+            session.last_accessed = datetime.now()
+        try:
+            yield session
+        finally:
+            with self._session_lock(session.session_id):
+                session.in_flight -= 1
+                session.last_accessed = datetime.now()
+    
+    def session_exists(self, session_id: str) -> bool:
+        """セッションがメモリ上またはディスクに休止中で存在するか（復元はしない）"""
+        return session_id in self._sessions or hibernation_store.exists(session_id)
+    
+    def bind_socket(self, session_id: str, websocket: Any) -> Session:
+        """WebSocket接続をセッションにバインドし、セッションを返す"""
+        session = self.get_session(session_id)
+        session.websocket = websocket
+        logger.info(f"WebSocket bound to session: {session_id}")
+        return session
+    
+    def unbind_socket(self, session_id: str, websocket: Any):
+        """WebSocket接続のバインドを解除"""
+        session = self._sessions.get(session_id)
+        if session is not None and session.websocket is websocket:
+            session.websocket = None
+            logger.info(f"WebSocket unbound from session: {session_id}")
+            
+            # 接続中のため残していた休止セッションのレコードを解放
+            if session.hibernated:
+                with self._session_lock(session_id):
+                    if session.hibernated and session.websocket is None:
+                        with self._lock:
+                            self._sessions.pop(session_id, None)
     
     def update_session(self, session_id: str, **kwargs):
         """セッションを更新"""
         session = self.get_session(session_id)
-        session.update(kwargs)
+        for key, value in kwargs.items():
+            setattr(session, key, value)
     
     def delete_session(self, session_id: str):
-        """セッションを削除"""
-        if session_id in self._sessions:
-            del self._sessions[session_id]
+        """セッションを削除（休止中のセッションも含む）"""
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            game_id = session.game_id
             logger.info(f"Session deleted: {session_id}")
+        else:
+            payload = hibernation_store.load(session_id)
+            game_id = payload["session"]["game_id"] if payload is not None else None
+        
+        hibernation_store.delete(session_id)
+        
+        if game_id is not None:
+            self._notify_end(game_id)
+    
+    def is_game_in_use(self, game_id: str) -> bool:
+        """メモリ上のいずれかのセッションがゲームを使用中か"""
+        return any(session.game_id == game_id for session in list(self._sessions.values()))
     
     def cleanup_old_sessions(self):
         """古いセッションをクリーンアップ"""
@@ -71,7 +304,8 @@ class SessionManager:
         
         to_delete = []
         for session_id, session in self._sessions.items():
-            if now - session["last_accessed"] > timeout:
+            # 休止中のセッションはディスク側の保持期間で管理する
+            if not session.hibernated and now - session.last_accessed > timeout:
                 to_delete.append(session_id)
         
         for session_id in to_delete:
@@ -80,10 +314,179 @@ class SessionManager:
         if to_delete:
             logger.info(f"Cleaned up {len(to_delete)} old sessions")
     
-    def get_all_sessions(self) -> Dict[str, Dict[str, Any]]:
+    def cleanup_hibernated_sessions(self) -> int:
+        """
+        保持期間を過ぎた休止セッションを削除
+        
+        Returns:
+            int: 削除したセッション数
+        """
+        expired = hibernation_store.expired(settings.hibernated_session_timeout)
+        for session_id in expired:
+            self.delete_session(session_id)
+        
+        return len(expired)
+    
+    def get_all_sessions(self) -> Dict[str, Session]:
         """全セッションを取得（デバッグ用）"""
         return self._sessions
-
+    
+    def hibernate_session(self, session_id: str) -> bool:
+        """
+        セッションを休止（状態とアクション履歴をディスクに書き出し、ゲーム環境を解放）
+        
+        WebSocketがバインドされているセッションはレコードのみメモリに残し、
+        次のアクションで同じオブジェクトに復元する。
+        
+        Returns:
+            bool: 休止した場合True
+        """
+        with self._session_lock(session_id):
+            session = self._sessions.get(session_id)
+            if session is None or session.hibernated or session.game_env is None:
+                return False
+            # エンジン処理中のセッションは休止しない（次のサイクルで再判定）
+            # 履歴を破棄したセッションは復元できないため休止しない
+            if session.in_flight or session.action_log is None:
+                return False
+            
+            size = hibernation_store.save(session_id, {"session": session.to_snapshot()})
+            
+            env = session.game_env
+            session.game_env = None
+            session.hibernated = True
+            if session.websocket is None:
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+        
+        try:
+            env.close()
+        except Exception as e:
+            logger.warning(f"Failed to close environment for session {session_id}: {e}")
+        
+        logger.info(f"Session hibernated: {session_id} ({size} bytes)")
+        
+        return True
+    
+    def hibernate_idle_sessions(self) -> int:
+        """
+        一定時間アクセスのないセッションを休止
+        
+        Returns:
+            int: 休止したセッション数
+        """
+        threshold = timedelta(seconds=settings.hibernate_after)
+        now = datetime.now()
+        
+        idle = [
+            session_id for session_id, session in list(self._sessions.items())
+            if not session.hibernated and session.game_env is not None and not session.in_flight
+            and session.action_log is not None and now - session.last_accessed > threshold
+        ]
+        
+        hibernated = sum(1 for session_id in idle if self.hibernate_session(session_id))
+        if hibernated:
+            logger.info(f"Hibernated {hibernated} idle sessions")
+        
+        return hibernated
+    
+    def ensure_env(self, session: Session):
+        """休止中のセッションのゲーム環境をその場で復元"""
+        with self._session_lock(session.session_id):
+            if not session.hibernated:
+                return
+            
+            payload = hibernation_store.load(session.session_id)
+            if payload is None:
+                raise GameSessionNotFound(f"Session {session.session_id} not found")
+            
+            self._restore(session, payload)
+            
+            # 休止時にレコードを解放済みなら登録し直す（以降の検索で同じオブジェクトを返す）
+            with self._lock:
+                self._sessions.setdefault(session.session_id, session)
+    
+    def _rehydrate(self, session_id: str) -> Optional[Session]:
+        """ディスクに休止しているセッションを復元（存在しなければNone）"""
+        with self._session_lock(session_id):
+            # 他のスレッドが先に復元していればそれを使う
+            session = self._sessions.get(session_id)
+            if session is not None:
+                if session.hibernated:
+                    self.ensure_env(session)
+                return session
+            
+            payload = hibernation_store.load(session_id)
+            if payload is None:
+                return None
+            
+            session = Session.from_snapshot(payload["session"])
+            self._restore(session, payload)
+            with self._lock:
+                self._sessions[session_id] = session
+        
+        return session
+    
+    def _restore(self, session: Session, payload: Dict[str, Any]):
+        """アクション履歴からゲーム環境を作り直し、休止状態を解除"""
+        if self._restore_env is None:
+            raise GameSessionNotFound(f"Session {session.session_id} cannot be restored")
+        
+        self._restore_env(session)
+        session.hibernated = False
+        hibernation_store.delete(session.session_id)
+        
+        logger.info(f"Session rehydrated: {session.session_id} (step {session.current_step})")
+    
+    async def run_hibernation(self):
+        """アイドルセッションの休止と期限切れの休止セッション削除を定期実行"""
+        while True:
+            await asyncio.sleep(settings.hibernation_check_interval)
+            try:
+                await asyncio.to_thread(self.hibernate_idle_sessions)
+                removed = await asyncio.to_thread(self.cleanup_hibernated_sessions)
+                if removed:
+                    logger.info(f"Removed {removed} expired hibernated sessions")
+            except Exception as e:
+                logger.error(f"Hibernation cycle failed: {e}", exc_info=True)
+    
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        セッションごとのメモリ使用量とInternPoolの使用量
+        
+        ゲーム環境（Jerichoのインタプリタ）はネイティブメモリのため計測対象外とし、保持数のみ返す。
+        セッションIDは /step・/ws の認証を兼ねるため先頭8文字だけを含める。
+        """
+        sessions = []
+        total_own = 0
+        env_count = 0
+        for session in list(self._sessions.values()):
+            usage = session.memory_usage()
+            total_own += usage["own"]
+            has_env = session.game_env is not None
+            env_count += has_env
+            sessions.append({
+                "session_id": session.session_id[:8],
+                "game_id": session.game_id,
+                "own_bytes": usage["own"],
+                "shared_bytes": usage["shared"],
+                "has_env": has_env,
+                "hibernated": session.hibernated,
+            })
+        
+        pools = intern_pools.report()
+        pool_bytes = sum(pool["bytes"] for pool in pools.values())
+        
+        return {
+            "session_count": len(sessions),
+            "env_count": env_count,
+            "hibernated_on_disk": hibernation_store.count(),
+            "total_own_bytes": total_own,
+            "intern_pool_bytes": pool_bytes,
+            "avg_bytes_per_session": (total_own + pool_bytes) // len(sessions) if sessions else 0,
+            "sessions": sessions,
+            "intern_pools": pools,
+        }
 
 # シングルトンインスタンス
 session_manager = SessionManager()
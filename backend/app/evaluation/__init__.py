@@ -0,0 +1,3 @@
+"""
+Agent Evaluation Harness
+"""
@@ -0,0 +1,48 @@
+"""
+エージェント評価ハーネスのCLI
+
+例:
+    python -m app.evaluation --games simple_game --policies stub random --episodes 20 --workers 4
+"""
+import json
+import argparse
+import logging
+
+from app.evaluation.runner import run_evaluation, summarize, write_results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless agent evaluation (N games x M policies)")
+    parser.add_argument("--games", nargs="+", default=["simple_game"], help="評価するゲームID")
+    parser.add_argument(
+        "--policies", nargs="+", default=["stub", "random"],
+        help="評価するポリシー（stub / random / gemini / gemini:<モデル名>）"
+    )
+    parser.add_argument("--episodes", type=int, default=10, help="ゲーム×ポリシーごとのエピソード数")
+    parser.add_argument("--seed", type=int, default=0, help="ベースシード")
+    parser.add_argument("--max-steps", type=int, default=None, help="エピソードあたりの最大ステップ数")
+    parser.add_argument("--workers", type=int, default=1, help="並列実行するプロセス数")
+    parser.add_argument("--output", default="eval_results.parquet", help="結果の出力先（.parquet / .csv）")
+    parser.add_argument("--log-level", default="WARNING", help="ログレベル")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=getattr(logging, args.log_level))
+    
+    results = run_evaluation(
+        games=args.games,
+        policies=args.policies,
+        episodes=args.episodes,
+        base_seed=args.seed,
+        max_steps=args.max_steps,
+        workers=args.workers,
+        log_level=args.log_level
+    )
+    
+    path = write_results(results, args.output)
+    
+    print(json.dumps(summarize(results), ensure_ascii=False, indent=2))
+    print(f"Wrote {len(results)} episodes to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import random
+import hashlib
+from typing import List, Optional
+
+from app.models.game import GameState
+from app.models.requests import ActionSuggestion
+from app.services.gemini_service import GeminiService
+
+# スタブが優先するアクションの動詞（先頭ほど優先）
+STUB_VERB_PRIORITY = ["unlock", "open", "take", "insert", "put", "eat", "go", "examine"]
+
+
+class _StubUsage:
+    """usage_metadata互換オブジェクト"""
+    
+    def __init__(self, total_token_count: int):
+        self.total_token_count = total_token_count
+
+
+class _StubResponse:
+    """generate_contentのレスポンス互換オブジェクト"""
+    
+    def __init__(self, text: str, total_token_count: int):
+        self.text = text
+        self.usage_metadata = _StubUsage(total_token_count)
+
+
+class StubModel:
+    """
+    決定的なローカルLLMスタブ（オフライン評価用）
+    
+    GeminiServiceが組み立てたプロンプトからアクション一覧を読み取り、
+    動詞の優先度とシード付きハッシュで1つを選んで、本物と同じ回答形式で返す。
+    プロンプト構築とレスポンス解析の経路はそのまま通る。
+    """
+    
+    def __init__(self, seed: int):
+        self.seed = seed
+    
+    def _extract_actions(self, prompt: str) -> List[str]:
+        """プロンプトの【利用可能なアクション】セクションを読み取る"""
+        actions = []
+        in_section = False
+        for line in prompt.splitlines():
+            if line.startswith("【利用可能なアクション】"):
+                in_section = True
+            elif line.startswith("【"):
+                in_section = False
+            elif in_section and line.startswith("- "):
+                actions.append(line[2:])
+        return actions
+    
+    def _rank(self, action: str, prompt: str) -> tuple:
+        """優先度の高い動詞を優先し、同順位はシード付きハッシュで決める"""
+        verb = action.split(" ", 1)[0]
+        priority = STUB_VERB_PRIORITY.index(verb) if verb in STUB_VERB_PRIORITY else len(STUB_VERB_PRIORITY)
+        digest = hashlib.sha256(f"{self.seed}:{prompt}:{action}".encode()).hexdigest()
+        return (priority, digest)
+    
+    async def generate_content_async(self, prompt: str) -> _StubResponse:
+        actions = self._extract_actions(prompt)
+        action = min(actions, key=lambda a: self._rank(a, prompt)) if actions else "look"
+        
+        text = f"思考過程: スタブが優先度に従って選択しました。\n選択: {action}"
+        # トークン数は文字数からの概算（約4文字で1トークン）
+        return _StubResponse(text, (len(prompt) + len(text)) // 4)
+
+
+class Policy:
+    """評価用のアクション選択ポリシー"""
+    
+    def __init__(self, name: str, service: Optional[GeminiService] = None):
+        self.name = name
+        self.service = service
+    
+    async def choose(self, state: GameState) -> ActionSuggestion:
+        """現在の状態から次のアクションを選択"""
+        if self.service is None:
+            # ランダムポリシー（GeminiServiceのフォールバックと同じ選び方）
+            return ActionSuggestion(
+                suggested_action=random.choice(state.available_actions),
+                reasoning="random policy",
+                is_fallback=True
+            )
+        
+        return await self.service.suggest_action(
+            observation=state.observation,
+            available_actions=state.available_actions,
+            score=state.score
+        )
+
+
+def build_policy(spec: str, seed: int) -> Policy:
+    """
+    ポリシー指定からPolicyを作成
+    
+    Args:
+        spec: "stub" / "random" / "gemini" / "gemini:<モデル名>"
+        seed: エピソードのシード（スタブの選択に使用）
+    
+    Returns:
+        Policy: アクション選択ポリシー
+    """
+    if spec == "random":
+        return Policy(spec)
+    
+    if spec == "stub":
+        return Policy(spec, GeminiService(model=StubModel(seed)))
+    
+    if spec == "gemini" or spec.startswith("gemini:"):
+        model_name = spec.split(":", 1)[1] if ":" in spec else None
+        return Policy(spec, GeminiService(model_name=model_name))
+    
+    raise ValueError(f"Unknown policy: {spec}")
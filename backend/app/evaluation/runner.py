@@ -0,0 +1,221 @@
+import csv
+import math
+import time
+import random
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, field, fields
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.core.session_manager import session_manager
+from app.services.textworld_service import textworld_service
+from app.evaluation.policies import build_policy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EpisodeResult:
+    """1エピソードの評価結果"""
+    game_id: str
+    policy: str
+    seed: int
+    score: int
+    won: bool
+    steps: int
+    steps_to_win: Optional[int]
+    llm_calls: int
+    fallback_calls: int
+    tokens: int
+    wall_time_s: float
+    turn_latency_p95_ms: float
+    error: Optional[str] = None
+    # ターンごとのレイテンシ（集計用、結果ファイルには書き出さない）
+    turn_latencies_ms: List[float] = field(default_factory=list, repr=False)
+
+
+# 結果ファイルに書き出さないフィールド
+_UNWRITTEN_FIELDS = {"turn_latencies_ms"}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """パーセンタイル（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+async def run_episode(game_id: str, policy: str, seed: int, max_steps: int) -> EpisodeResult:
+    """
+    HTTPを介さずにTextWorldServiceとポリシーを直接駆動して1エピソードを実行
+    
+    同じ (game_id, policy, seed) なら同じ結果になるよう、乱数をシードで初期化する。
+    """
+    random.seed(seed)
+    agent = build_policy(policy, seed)
+    
+    session_id = session_manager.create_session(game_id)
+    latencies: List[float] = []
+    llm_calls = fallback_calls = tokens = 0
+    started = time.perf_counter()
+    
+    try:
+        state = textworld_service.initialize_game(session_id, game_id)
+        
+        while not state.done and state.current_step < max_steps and state.available_actions:
+            turn_started = time.perf_counter()
+            
+            suggestion = await agent.choose(state)
+            state = textworld_service.execute_action(session_id, suggestion.suggested_action)
+            
+            latencies.append(time.perf_counter() - turn_started)
+            if suggestion.is_fallback:
+                fallback_calls += 1
+            else:
+                llm_calls += 1
+            tokens += suggestion.token_count or 0
+        
+        won = session_manager.get_session(session_id).won
+        error = None
+    except Exception as e:
+        logger.error(f"Episode failed: {game_id} / {policy} / seed={seed}: {e}")
+        state = None
+        won = False
+        error = str(e)
+    finally:
+        session = session_manager.get_all_sessions().get(session_id)
+        if session is not None and session.game_env is not None:
+            session.game_env.close()
+        session_manager.delete_session(session_id)
+    
+    steps = state.current_step if state is not None else 0
+    
+    return EpisodeResult(
+        game_id=game_id,
+        policy=policy,
+        seed=seed,
+        score=state.score if state is not None else 0,
+        won=won,
+        steps=steps,
+        steps_to_win=steps if won else None,
+        llm_calls=llm_calls,
+        fallback_calls=fallback_calls,
+        tokens=tokens,
+        wall_time_s=round(time.perf_counter() - started, 4),
+        turn_latency_p95_ms=round(_percentile(latencies, 0.95) * 1000, 2),
+        error=error,
+        turn_latencies_ms=[round(latency * 1000, 3) for latency in latencies]
+    )
+
+
+def _init_worker(log_level: str):
+    """ワーカープロセスのロギング設定"""
+    logging.basicConfig(level=getattr(logging, log_level))
+
+
+def _run_episode_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """プロセスプールから呼び出すエピソード実行（トップレベル関数）"""
+    return asdict(asyncio.run(run_episode(**job)))
+
+
+def run_evaluation(
+    games: List[str],
+    policies: List[str],
+    episodes: int,
+    base_seed: int = 0,
+    max_steps: Optional[int] = None,
+    workers: int = 1,
+    log_level: str = "WARNING"
+) -> List[EpisodeResult]:
+    """
+    N games × M policies × episodes のエピソードを複数プロセスで並列実行
+    
+    各エピソードのシードは base_seed + エピソード番号。全ポリシーが同じシード列で評価される。
+    
+    Returns:
+        List[EpisodeResult]: (game_id, policy, seed) 順に並んだ結果
+    """
+    max_steps = max_steps or settings.default_max_steps
+    jobs = [
+        {"game_id": game_id, "policy": policy, "seed": base_seed + i, "max_steps": max_steps}
+        for game_id in games
+        for policy in policies
+        for i in range(episodes)
+    ]
+    
+    logger.info(f"Running {len(jobs)} episodes on {workers} worker(s)")
+    
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(log_level,)
+    ) as executor:
+        results = [EpisodeResult(**row) for row in executor.map(_run_episode_job, jobs)]
+    
+    return sorted(results, key=lambda r: (r.game_id, r.policy, r.seed))
+
+
+def summarize(results: List[EpisodeResult]) -> List[Dict[str, Any]]:
+    """(game_id, policy) ごとの集計"""
+    groups: Dict[tuple, List[EpisodeResult]] = {}
+    for result in results:
+        groups.setdefault((result.game_id, result.policy), []).append(result)
+    
+    summary = []
+    for (game_id, policy), group in sorted(groups.items()):
+        wins = [r.steps_to_win for r in group if r.won]
+        summary.append({
+            "game_id": game_id,
+            "policy": policy,
+            "episodes": len(group),
+            "errors": sum(1 for r in group if r.error),
+            "mean_score": round(sum(r.score for r in group) / len(group), 3),
+            "win_rate": round(len(wins) / len(group), 3),
+            "mean_steps_to_win": round(sum(wins) / len(wins), 2) if wins else None,
+            "llm_calls": sum(r.llm_calls for r in group),
+            "tokens": sum(r.tokens for r in group),
+            "mean_wall_time_s": round(sum(r.wall_time_s for r in group) / len(group), 4),
+            # エピソードごとのp95ではなく、全ターンのレイテンシから計算
+            "turn_latency_p95_ms": round(
+                _percentile([latency for r in group for latency in r.turn_latencies_ms], 0.95), 2
+            ),
+        })
+    
+    return summary
+
+
+def write_results(results: List[EpisodeResult], path: str) -> str:
+    """
+    結果を列指向形式で書き出し
+    
+    .parquet の場合はpyarrow（オプション依存）を使用し、未インストールならCSVに切り替える。
+    
+    Returns:
+        str: 実際に書き出したファイルパス
+    """
+    columns = [f.name for f in fields(EpisodeResult) if f.name not in _UNWRITTEN_FIELDS]
+    
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            table = pa.table({name: [getattr(r, name) for r in results] for name in columns})
+            pq.write_table(table, path)
+            return path
+        except ImportError:
+            path = path[: -len(".parquet")] + ".csv"
+            logger.warning(f"pyarrow is not installed, writing CSV instead: {path}")
+    
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        for result in results:
+            writer.writerow({name: getattr(result, name) for name in columns})
+    
+    return path
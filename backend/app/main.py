@@ -1,17 +1,27 @@
+import math
+import time
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 
 from app.config import settings
-from app.api import game, ai
+from app.api import game, ai, ws, admin
+from app.services.textworld_service import textworld_service
+from app.services.gemini_service import gemini_service
+from app.services.generation_service import generation_service
+from app.core.profiler import profiler
+from app.core.session_manager import session_manager
 from app.core.exceptions import (
     GameSessionNotFound,
     InvalidGameAction,
     GeminiAPIError,
-    TextWorldError
+    TextWorldError,
+    AdmissionRejected
 )
 
 # ロギング設定
@@ -22,16 +32,68 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# モジュール読み込み（インポート）完了時刻
+_import_finished = time.perf_counter()
+
+
+def _warmup() -> dict:
+    """重い依存関係の読み込みとゲーム環境の事前作成を行い、所要時間の内訳を返す"""
+    timings = {}
+    
+    started = time.perf_counter()
+    import textworld  # noqa: F401
+    timings["import_textworld"] = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    gemini_service.warmup()
+    timings["init_gemini"] = time.perf_counter() - started
+    
+    for game_id, elapsed in textworld_service.warmup(settings.warmup_games).items():
+        timings[f"prime_game:{game_id}"] = elapsed
+    
+    return timings
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """アプリケーションのライフサイクル管理"""
     logger.info(f"Starting {settings.app_name}")
     logger.info(f"Gemini API configured: {settings.gemini_api_key is not None}")
     
-    # 起動時の処理
+    # 起動時の処理（ウォームアップが終わるまでリクエストを受け付けない）
+    startup_started = time.perf_counter()
+    timings = {}
+    if settings.warmup_on_startup:
+        try:
+            timings = _warmup()
+        except Exception as e:
+            logger.warning(f"Warm-up failed, continuing with lazy initialization: {e}")
+    
+    app.state.startup_timings = timings
+    breakdown = ", ".join(f"{name}={elapsed * 1000:.0f}ms" for name, elapsed in timings.items())
+    logger.info(
+        f"Startup complete in {(time.perf_counter() - startup_started) * 1000:.0f}ms "
+        f"(since import: {(time.perf_counter() - _import_finished) * 1000:.0f}ms) [{breakdown}]"
+    )
+    
+    # 生成ゲームの事前生成ストックをバックグラウンドで補充
+    generation_service.start()
+    
+    if settings.profiling_enabled and settings.profiling_continuous:
+        profiler.start_continuous()
+    
+    # アイドルセッションの休止を定期実行
+    hibernation_task = None
+    if settings.hibernation_enabled:
+        hibernation_task = asyncio.create_task(session_manager.run_hibernation())
+    
     yield
     
     # シャットダウン時の処理
+    if hibernation_task is not None:
+        hibernation_task.cancel()
+    profiler.stop_continuous()
+    await generation_service.stop()
     logger.info(f"Shutting down {settings.app_name}")
 
 
@@ -52,9 +114,19 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンス圧縮（オプション）
+if settings.response_compression:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.compression_minimum_size)
+
+# プロファイリング（有効時のみ登録するため、無効時のオーバーヘッドはない）
+if settings.profiling_enabled:
+    app.middleware("http")(profiler.middleware)
+
 # ルーター登録
 app.include_router(game.router, prefix="", tags=["Game"])
 app.include_router(ai.router, prefix="/gemini", tags=["AI"])
+app.include_router(ws.router, prefix="", tags=["Channel"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
 
 
 # エラーハンドラー
@@ -85,6 +157,16 @@ async def gemini_api_error_handler(request, exc):
     )
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc):
+    logger.warning(f"Request rejected by admission control: {exc}")
+    return JSONResponse(
+        status_code=429,
+        content={"error": "Too many requests", "detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+
 @app.exception_handler(TextWorldError)
 async def textworld_error_handler(request, exc):
     logger.error(f"TextWorld error: {exc}")
@@ -12,6 +12,23 @@ class GameState(BaseModel):
     done: bool = Field(default=False, description="ゲーム終了フラグ")
     max_steps: int = Field(default=100, description="最大ステップ数")
     current_step: int = Field(default=0, description="現在のステップ数")
+    version: int = Field(default=0, description="状態バージョン（クライアント側の差分適用用）")
+
+
+class CompactGameState(BaseModel):
+    """差分エンコードされたゲーム状態（compactモード）"""
+    session_id: str = Field(..., description="セッションID")
+    version: int = Field(..., description="状態バージョン")
+    base_version: Optional[int] = Field(None, description="差分の基準となるバージョン（全量送信時はnull）")
+    observation: str = Field(..., description="現在の観察結果")
+    available_actions: Optional[List[str]] = Field(None, description="利用可能なアクション（全量送信時のみ）")
+    actions_added: List[str] = Field(default_factory=list, description="前バージョンから追加されたアクション")
+    actions_removed: List[str] = Field(default_factory=list, description="前バージョンから削除されたアクション")
+    score: int = Field(default=0, description="現在のスコア")
+    reward: Optional[int] = Field(None, description="最後のアクションの報酬")
+    done: bool = Field(default=False, description="ゲーム終了フラグ")
+    max_steps: int = Field(default=100, description="最大ステップ数")
+    current_step: int = Field(default=0, description="現在のステップ数")
 
 
 class GameStep(BaseModel):
@@ -1,16 +1,29 @@
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field, model_validator
 
 
 class ResetRequest(BaseModel):
     """ゲームリセットリクエスト"""
-    game_id: str = Field(..., description="ゲームID", example="simple_game")
+    game_id: Optional[str] = Field(None, description="ゲームID", example="simple_game")
+    difficulty: Optional[Literal["easy", "medium", "hard"]] = Field(
+        None, description="指定時は事前生成されたランダムゲームを使用（game_idより優先）"
+    )
+    
+    @model_validator(mode="after")
+    def check_game_selection(self):
+        """game_idかdifficultyのどちらかが必要"""
+        if self.game_id is None and self.difficulty is None:
+            raise ValueError("Either game_id or difficulty is required")
+        return self
 
 
 class StepRequest(BaseModel):
     """アクション実行リクエスト"""
     session_id: str = Field(..., description="セッションID")
     action: str = Field(..., description="実行するアクション", example="go north")
+    mode: Literal["manual", "auto"] = Field(default="manual", description="プレイモード（スケジューリングの優先度）")
+    compact: bool = Field(default=False, description="差分エンコードされたレスポンスを返すか")
+    known_version: Optional[int] = Field(None, description="クライアントが保持している状態バージョン（compact時の差分基準）")
 
 
 class SuggestActionRequest(BaseModel):
@@ -20,6 +33,7 @@ class SuggestActionRequest(BaseModel):
     available_actions: List[str] = Field(..., description="利用可能なアクション")
     score: int = Field(default=0, description="現在のスコア")
     user_instruction: Optional[str] = Field(None, description="ユーザーからの指示")
+    mode: Literal["manual", "auto"] = Field(default="manual", description="プレイモード（スケジューリングの優先度）")
 
 
 class ActionSuggestion(BaseModel):
@@ -27,4 +41,20 @@ class ActionSuggestion(BaseModel):
     suggested_action: str = Field(..., description="推奨されるアクション")
     reasoning: Optional[str] = Field(None, description="推奨理由")
     is_fallback: bool = Field(default=False, description="フォールバック使用フラグ")
+    token_count: Optional[int] = Field(None, description="使用トークン数（取得できた場合）")
 
+
+class ChannelMessage(BaseModel):
+    """WebSocketゲームチャネルのクライアントメッセージ"""
+    type: Literal["action", "suggest"] = Field(..., description="メッセージ種別")
+    action: Optional[str] = Field(None, description="実行するアクション（type=action時）", example="go north")
+    mode: Literal["manual", "auto"] = Field(default="manual", description="プレイモード（スケジューリングの優先度）")
+    suggest: bool = Field(default=False, description="状態送信後にAI推奨アクションをプッシュするか")
+    user_instruction: Optional[str] = Field(None, description="ユーザーからの指示")
+
+
+class ProfileArmRequest(BaseModel):
+    """プロファイリング予約リクエスト"""
+    count: int = Field(default=1, ge=1, le=100, description="プロファイルするリクエスト数")
+    route: Optional[str] = Field(None, description="対象ルート（未指定なら全ルート）", example="/step")
+    session_id: Optional[str] = Field(None, description="対象セッションID（未指定なら全セッション）")
@@ -1,7 +1,6 @@
 import logging
 import random
 from typing import List, Optional
-import google.generativeai as genai
 
 from app.config import settings
 from app.models.requests import ActionSuggestion
@@ -13,22 +12,48 @@ logger = logging.getLogger(__name__)
 class GeminiService:
     """Gemini AIサービス"""
     
-    def __init__(self):
+    def __init__(self, model_name: Optional[str] = None, model=None):
+        """
+        Args:
+            model_name: 使用するモデル名（未指定なら設定値）
+            model: generate_content_async を持つモデルオブジェクト（評価用スタブなどを直接注入する場合）
+        """
         self.api_key = settings.gemini_api_key
-        self.model_name = settings.gemini_model
+        self.model_name = model_name or settings.gemini_model
         self.timeout = settings.gemini_timeout
         
-        if self.api_key:
-            try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(self.model_name)
-                logger.info(f"Gemini AI initialized with model: {self.model_name}")
-            except Exception as e:
-                logger.error(f"Failed to initialize Gemini AI: {e}")
-                self.model = None
-        else:
-            self.model = None
+        # SDKのインポートとモデル生成は初回利用時（またはウォームアップ時）まで遅延
+        self._model = model
+        self._initialized = model is not None
+    
+    @property
+    def model(self):
+        """Geminiモデル（初回アクセス時に初期化）"""
+        if not self._initialized:
+            self._initialize()
+        return self._model
+    
+    def _initialize(self):
+        """google.generativeaiをインポートしてモデルを初期化"""
+        self._initialized = True
+        
+        if not self.api_key:
             logger.warning("Gemini API key not configured")
+            return
+        
+        try:
+            import google.generativeai as genai
+            
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel(self.model_name)
+            logger.info(f"Gemini AI initialized with model: {self.model_name}")
+        except Exception as e:
+            logger.error(f"Failed to initialize Gemini AI: {e}")
+            self._model = None
+    
+    def warmup(self):
+        """起動時にSDKのインポートとモデル初期化を済ませる"""
+        return self.model
     
     async def suggest_action(
         self,
@@ -52,8 +77,8 @@ class GeminiService:
                 user_instruction
             )
             
-            # Gemini APIを呼び出し
-            response = self.model.generate_content(prompt)
+            # Gemini APIを呼び出し（イベントループをブロックしない非同期版）
+            response = await self.model.generate_content_async(prompt)
             
             # レスポンスをパース（思考過程とアクションを分離）
             suggested_action, reasoning = self._parse_response(
@@ -67,7 +92,8 @@ class GeminiService:
             return ActionSuggestion(
                 suggested_action=suggested_action,
                 reasoning=reasoning,
-                is_fallback=False
+                is_fallback=False,
+                token_count=self._token_count(response)
             )
             
         except Exception as e:
@@ -176,6 +202,11 @@ class GeminiService:
         
         return selected_action, reasoning
     
+    def _token_count(self, response) -> Optional[int]:
+        """レスポンスの使用トークン数（取得できない場合はNone）"""
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "total_token_count", None) if usage is not None else None
+    
     def _fallback_action(self, available_actions: List[str]) -> ActionSuggestion:
         """フォールバックアクション（ランダム選択）"""
         action = random.choice(available_actions)
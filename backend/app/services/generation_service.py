@@ -0,0 +1,246 @@
+import os
+import random
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict
+from typing import Deque, Dict, Optional
+
+from app.config import settings
+from app.core.exceptions import TextWorldError
+from app.core.session_manager import session_manager
+from app.core.intern_pool import intern_pools
+
+logger = logging.getLogger(__name__)
+
+# 生成ゲームのIDの接頭辞（静的ゲームと区別し、削除対象をこれに限定する）
+GENERATED_GAME_PREFIX = "gen_"
+
+
+@dataclass(frozen=True)
+class GameSpec:
+    """生成ゲームの仕様（同じ仕様なら同じゲームが生成される）"""
+    seed: int
+    world_size: int
+    nb_objects: int
+    quest_length: int
+    
+    @property
+    def game_id(self) -> str:
+        """仕様から決まるコンテンツアドレス型のゲームID"""
+        key = f"{self.seed}:{self.world_size}:{self.nb_objects}:{self.quest_length}"
+        return f"{GENERATED_GAME_PREFIX}{hashlib.sha256(key.encode()).hexdigest()[:16]}"
+
+
+# 難易度ごとの生成パラメータ（world_size, nb_objects, quest_length）
+DIFFICULTY_PRESETS: Dict[str, Dict[str, int]] = {
+    "easy": {"world_size": 3, "nb_objects": 5, "quest_length": 2},
+    "medium": {"world_size": 6, "nb_objects": 10, "quest_length": 4},
+    "hard": {"world_size": 10, "nb_objects": 20, "quest_length": 8},
+}
+
+
+def _compile_game(spec: Dict[str, int], output_path: str) -> str:
+    """
+    ワーカープロセスでゲームを生成・コンパイル
+    
+    プロセスプールから呼び出すため、モジュールのトップレベル関数として定義する。
+    """
+    import textworld
+    
+    options = textworld.GameOptions()
+    options.seeds = spec["seed"]
+    options.nb_rooms = spec["world_size"]
+    options.nb_objects = spec["nb_objects"]
+    options.quest_length = spec["quest_length"]
+    options.path = output_path
+    options.force_recompile = True
+    
+    game = textworld.generator.make_game(options)
+    return textworld.generator.compile_game(game, options)
+
+
+class GenerationService:
+    """プロシージャルゲーム生成サービス（事前生成ストック付き）"""
+    
+    def __init__(self):
+        self.output_dir = settings.generated_games_directory
+        self.stock_size = settings.pregenerated_stock_size
+        
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stock: Dict[str, Deque[str]] = {name: deque() for name in DIFFICULTY_PRESETS}
+        self._refill_event: Optional[asyncio.Event] = None
+        self._refill_task: Optional[asyncio.Task] = None
+        
+        # セッション終了時に使われなくなった生成ゲームを削除
+        session_manager.register_end_handler(self.release_game)
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """プロセスプールを取得（初回利用時に作成）"""
+        if self._executor is None:
+            # forkはイベントループやJerichoの状態を引き継ぐためspawnを使用
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.generation_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+    
+    def game_path(self, game_id: str) -> str:
+        """生成ゲームのファイルパス"""
+        return os.path.join(self.output_dir, f"{game_id}.z8")
+    
+    def spec_for(self, difficulty: str, seed: Optional[int] = None) -> GameSpec:
+        """難易度とシードから生成仕様を作成"""
+        if difficulty not in DIFFICULTY_PRESETS:
+            raise ValueError(f"Unknown difficulty: {difficulty}")
+        
+        if seed is None:
+            seed = random.randrange(2**31)
+        
+        return GameSpec(seed=seed, **DIFFICULTY_PRESETS[difficulty])
+    
+    async def generate(self, spec: GameSpec) -> str:
+        """
+        ゲームを生成（生成済みならディスク上のものを再利用）
+        
+        Returns:
+            str: 生成されたゲームID
+        """
+        game_id = spec.game_id
+        
+        if os.path.exists(self.game_path(game_id)):
+            return game_id
+        
+        # 同じ仕様の生成が進行中なら完了を待つ
+        if game_id in self._in_flight:
+            await self._in_flight[game_id]
+            return game_id
+        
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self._get_executor(),
+            _compile_game,
+            asdict(spec),
+            self.game_path(game_id)
+        )
+        self._in_flight[game_id] = future
+        
+        try:
+            await future
+        except Exception as e:
+            logger.error(f"Failed to generate game {game_id}: {e}", exc_info=True)
+            raise TextWorldError(f"Failed to generate game: {str(e)}")
+        finally:
+            del self._in_flight[game_id]
+        
+        logger.info(f"Game generated: {game_id} ({spec})")
+        
+        return game_id
+    
+    async def take_random_game(self, difficulty: str) -> str:
+        """
+        指定難易度のランダムゲームを取得
+        
+        事前生成ストックから取り出し、ストックが空の場合のみその場で生成する。
+        """
+        stock = self._stock[difficulty]
+        
+        if stock:
+            game_id = stock.popleft()
+        else:
+            logger.warning(f"Pre-generated stock empty for difficulty: {difficulty}, generating on demand")
+            game_id = await self.generate(self.spec_for(difficulty))
+        
+        # バックグラウンドでストックを補充
+        if self._refill_event is not None:
+            self._refill_event.set()
+        
+        return game_id
+    
+    def release_game(self, game_id: str) -> bool:
+        """
+        使われなくなった生成ゲームのファイルを削除
+        
+        ストック中・生成中・他のセッションで使用中のゲームと、静的ゲームは削除しない。
+        
+        Returns:
+            bool: 削除した場合True
+        """
+        if not game_id.startswith(GENERATED_GAME_PREFIX):
+            return False
+        if game_id in self._in_flight or any(game_id in stock for stock in self._stock.values()):
+            return False
+        if session_manager.is_game_in_use(game_id):
+            return False
+        
+        # コンパイル結果（.z8 / .json / .ni など）をまとめて削除
+        removed = False
+        if os.path.isdir(self.output_dir):
+            for name in os.listdir(self.output_dir):
+                if name.split(".", 1)[0] != game_id:
+                    continue
+                try:
+                    os.remove(os.path.join(self.output_dir, name))
+                    removed = True
+                except OSError as e:
+                    logger.warning(f"Failed to remove generated game file {name}: {e}")
+        
+        # このゲーム用の共有テキストも不要になる
+        intern_pools.discard(game_id)
+        
+        if removed:
+            logger.info(f"Generated game removed: {game_id}")
+        
+        return removed
+    
+    def stock_levels(self) -> Dict[str, int]:
+        """難易度ごとの事前生成ストック数"""
+        return {difficulty: len(stock) for difficulty, stock in self._stock.items()}
+    
+    async def _refill_loop(self):
+        """ストックが目標数を下回った難易度を補充し続ける"""
+        while True:
+            for difficulty, stock in self._stock.items():
+                while len(stock) < self.stock_size:
+                    try:
+                        game_id = await self.generate(self.spec_for(difficulty))
+                    except TextWorldError:
+                        break
+                    stock.append(game_id)
+            
+            self._refill_event.clear()
+            await self._refill_event.wait()
+    
+    def start(self):
+        """バックグラウンドでのストック補充を開始"""
+        if self.stock_size <= 0 or self._refill_task is not None:
+            return
+        
+        self._refill_event = asyncio.Event()
+        self._refill_task = asyncio.create_task(self._refill_loop())
+        logger.info(f"Game generation started (stock per difficulty: {self.stock_size})")
+    
+    async def stop(self):
+        """ストック補充を停止し、プロセスプールを終了"""
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+            self._refill_event = None
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# シングルトンインスタンス
+generation_service = GenerationService()
@@ -1,12 +1,14 @@
 import os
+import time
+import random
 import logging
-import textworld
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Sequence
 
 from app.config import settings
 from app.core.exceptions import TextWorldError, GameNotFoundError
-from app.core.session_manager import session_manager
-from app.models.game import GameState
+from app.core.session_manager import session_manager, Session
+from app.core.intern_pool import intern_pools
+from app.models.game import GameState, CompactGameState
 
 logger = logging.getLogger(__name__)
 
@@ -16,16 +18,59 @@ class TextWorldService:
     
     def __init__(self):
         self.games_dir = settings.games_directory
+        # ウォームアップ済みの環境（ゲームIDごとに1つ、最初の/resetで使用）
+        self._warm_envs: Dict[str, Any] = {}
+        
+        # 休止していたセッションのゲーム環境の復元処理を登録
+        session_manager.register_env_handler(self._restore_env)
+    
+    def _start_env(self, game_path: str):
+        """TextWorld環境を作成（admissible_commandsを有効化）"""
+        # textworldのインポートは重いため初回利用時（またはウォームアップ時）まで遅延
+        import textworld
+        
+        request_infos = textworld.EnvInfos(
+            description=True,
+            inventory=True,
+            admissible_commands=True,
+            won=True,
+            lost=True
+        )
+        return textworld.start(game_path, request_infos=request_infos)
+    
+    def warmup(self, game_ids: List[str]) -> Dict[str, float]:
+        """
+        指定ゲームの環境を事前に1つずつ作成・リセットしておく
+        
+        Returns:
+            Dict[str, float]: ゲームIDごとのウォームアップ所要時間（秒）
+        """
+        timings: Dict[str, float] = {}
+        
+        for game_id in game_ids:
+            started = time.perf_counter()
+            try:
+                env = self._start_env(self._get_game_path(game_id))
+                env.reset()
+                self._warm_envs[game_id] = env
+            except Exception as e:
+                logger.warning(f"Warm-up failed for game {game_id}: {e}")
+                continue
+            timings[game_id] = time.perf_counter() - started
+        
+        return timings
     
     def _get_game_path(self, game_id: str) -> str:
         """ゲームファイルパスを取得"""
         # 複数の拡張子を試す
         extensions = [".z8", ".ulx", ".zblorb"]
         
-        for ext in extensions:
-            game_path = os.path.join(self.games_dir, f"{game_id}{ext}")
-            if os.path.exists(game_path):
-                return game_path
+        # 静的ゲームと生成ゲームの両方のディレクトリを探す
+        for games_dir in (self.games_dir, settings.generated_games_directory):
+            for ext in extensions:
+                game_path = os.path.join(games_dir, f"{game_id}{ext}")
+                if os.path.exists(game_path):
+                    return game_path
         
         raise GameNotFoundError(f"Game file not found for game_id: {game_id}")
     
@@ -34,31 +79,25 @@ class TextWorldService:
         try:
             game_path = self._get_game_path(game_id)
             
-            # TextWorld環境を作成（admissible_commandsを有効化）
-            request_infos = textworld.EnvInfos(
-                description=True,
-                inventory=True,
-                admissible_commands=True,
-                won=True,
-                lost=True
-            )
-            env = textworld.start(game_path, request_infos=request_infos)
+            # ウォームアップ済みの環境があれば使用し、なければ新規作成
+            env = self._warm_envs.pop(game_id, None) or self._start_env(game_path)
+            
+            # 休止からの復元（リプレイ）で同じ状態になるよう、乱数シードを固定してリセット
+            # （Jerichoはデフォルトで時刻から乱数を初期化する）
+            seed = random.randrange(2**31)
+            env.seed(seed)
             game_state_tw = env.reset()
             
             # セッションに保存
-            session_manager.update_session(
-                session_id,
-                game_env=env,
-                game_state=game_state_tw,
-                current_step=0
-            )
+            session = session_manager.get_session(session_id)
+            session.game_env = env
+            session.seed = seed
+            session.current_step = 0
+            session.state_version = 1
+            self._store_state(session, game_state_tw)
             
             # GameStateに変換
-            state = self._convert_to_game_state(
-                session_id=session_id,
-                game_state_tw=game_state_tw,
-                current_step=0
-            )
+            state = self._to_game_state(session)
             
             logger.info(f"Game initialized: {game_id} for session: {session_id}")
             
@@ -70,47 +109,42 @@ class TextWorldService:
     
     def execute_action(self, session_id: str, action: str) -> GameState:
         """アクションを実行"""
+        session = session_manager.get_session(session_id)
+        return self.execute_action_on_session(session, action)
+    
+    def execute_action_on_session(self, session: Session, action: str) -> GameState:
+        """取得済みのセッションに対してアクションを実行（WebSocket接続ではセッション検索を接続時の1回に抑える）"""
         try:
-            session = session_manager.get_session(session_id)
-            env = session["game_env"]
-            current_step = session["current_step"]
-            previous_game_state = session.get("game_state")
-            
-            if env is None:
-                raise TextWorldError("Game environment not initialized")
-            
-            # 前のスコアを取得
-            previous_score = previous_game_state.get("score", 0) if previous_game_state else 0
-            
-            # アクションを実行
-            game_state_tw, tw_reward, done = env.step(action)
-            
-            # 現在のスコアを取得
-            current_score = game_state_tw.get("score", 0)
+            # 処理中は休止させない（最終アクセス時刻もステップ前に更新される）
+            with session_manager.in_use(session):
+                # 休止中ならゲーム環境を復元
+                if session.hibernated:
+                    session_manager.ensure_env(session)
+                
+                env = session.game_env
+                
+                if env is None:
+                    raise TextWorldError("Game environment not initialized")
+                
+                # 前のスコアを取得
+                previous_score = session.score
+                
+                # アクションを実行
+                game_state_tw, tw_reward, done = env.step(action)
+                
+                # ステップと状態バージョンをインクリメントし、セッションを更新
+                session.current_step += 1
+                session.state_version += 1
+                session.record_action(action)
+                self._store_state(session, game_state_tw, done=done)
             
             # 報酬は前のスコアとの差分として計算
-            reward = current_score - previous_score
-            
-            # ステップをインクリメント
-            current_step += 1
-            
-            # セッションを更新
-            session_manager.update_session(
-                session_id,
-                game_state=game_state_tw,
-                current_step=current_step
-            )
+            reward = session.score - previous_score
             
             # GameStateに変換
-            state = self._convert_to_game_state(
-                session_id=session_id,
-                game_state_tw=game_state_tw,
-                current_step=current_step,
-                reward=reward,
-                done=done
-            )
+            state = self._to_game_state(session, reward=reward)
             
-            logger.debug(f"Action executed: {action} -> Score: {current_score}, Reward: {reward}, Done: {done}")
+            logger.debug(f"Action executed: {action} -> Score: {session.score}, Reward: {reward}, Done: {session.done}")
             
             return state
             
@@ -118,41 +152,115 @@ class TextWorldService:
             logger.error(f"Failed to execute action: {e}", exc_info=True)
             raise TextWorldError(f"Failed to execute action: {str(e)}")
     
-    def _convert_to_game_state(
+    def get_session_state(self, session: Session) -> GameState:
+        """セッションに保存された現在の状態をGameStateとして取得"""
+        if session.game_env is None and not session.hibernated:
+            raise TextWorldError("Game environment not initialized")
+        
+        return self._to_game_state(session)
+    
+    def execute_action_compact(
         self,
         session_id: str,
-        game_state_tw: Dict[str, Any],
-        current_step: int,
-        reward: Optional[int] = None,
-        done: bool = False
-    ) -> GameState:
-        """TextWorldの状態をGameStateに変換"""
+        action: str,
+        known_version: Optional[int] = None
+    ) -> CompactGameState:
+        """アクションを実行し、差分エンコードされた状態を返す"""
+        session = session_manager.get_session(session_id)
         
-        # 観察結果を取得
-        observation = game_state_tw.get("feedback", game_state_tw.get("description", ""))
+        # 実行前のアクション一覧とバージョンを保持（差分の基準）
+        previous_actions = session.available_actions
+        previous_version = session.state_version
+        
+        state = self.execute_action_on_session(session, action)
+        
+        # クライアントのバージョンが一致する場合のみ差分を送る（不一致なら全量で再同期）
+        if known_version is not None and known_version == previous_version:
+            return self._to_compact_state(state, previous_actions, previous_version)
+        return self._to_compact_state(state)
+    
+    def _to_compact_state(
+        self,
+        state: GameState,
+        previous_actions: Optional[Sequence[str]] = None,
+        base_version: Optional[int] = None
+    ) -> CompactGameState:
+        """GameStateを差分エンコード（previous_actionsがNoneなら全量）"""
+        fields = state.model_dump(exclude={"available_actions"})
+        
+        if base_version is None:
+            return CompactGameState(**fields, available_actions=state.available_actions)
+        
+        previous = set(previous_actions)
+        current = set(state.available_actions)
+        return CompactGameState(
+            **fields,
+            base_version=base_version,
+            actions_added=[a for a in state.available_actions if a not in previous],
+            actions_removed=[a for a in previous_actions if a not in current]
+        )
+    
+    def _restore_env(self, session: Session):
+        """
+        休止していたセッションのゲーム環境を作り直す
         
-        # 利用可能なアクションを取得
-        available_actions = game_state_tw.get("admissible_commands", [])
+        アクション履歴をリプレイして復元する。Jerichoのset_stateはインタプリタのメモリしか戻さず、
+        TextWorldラッパー側の進行状況（admissible_commands・クエスト進捗・won）が初期状態のままになるため使わない。
+        初期化時と同じ乱数シードでリセットし、リプレイ結果が休止前の状態と一致しなければエラーにする。
+        
+        Raises:
+            TextWorldError: リプレイ後のスコアまたは観察結果が休止前と一致しない場合
+        """
+        env = self._start_env(self._get_game_path(session.game_id))
+        if session.seed is not None:
+            env.seed(session.seed)
+        game_state_tw = env.reset()
+        
+        for action in session.action_log:
+            game_state_tw, _, _ = env.step(action)
         
-        # スコアを取得
         score = game_state_tw.get("score", 0)
+        observation = self._observation_of(game_state_tw)
+        if score != session.score or observation != session.observation:
+            env.close()
+            raise TextWorldError(
+                f"Replay of session {session.session_id} diverged after {len(session.action_log)} actions "
+                f"(score {score} != {session.score} or observation differs); the game is not deterministic"
+            )
         
-        # ゲーム終了判定（won/lostも確認）
-        if not done:
-            done = game_state_tw.get("won", False) or game_state_tw.get("lost", False)
+        session.game_env = env
+    
+    def _observation_of(self, game_state_tw: Dict[str, Any]) -> str:
+        """TextWorldの状態から観察結果のテキストを取得"""
+        return game_state_tw.get("feedback", game_state_tw.get("description", ""))
+    
+    def _store_state(self, session: Session, game_state_tw: Dict[str, Any], done: bool = False):
+        """TextWorldの状態から返却に必要なフィールドだけをセッションに保存"""
+        pool = intern_pools.get(session.game_id)
+        
+        # 観察結果と利用可能なアクションは同じゲームのセッション間で共有
+        session.observation = pool.intern_text(self._observation_of(game_state_tw))
+        session.available_actions = pool.intern_actions(game_state_tw.get("admissible_commands", []))
+        session.score = game_state_tw.get("score", 0)
         
+        # ゲーム終了判定（won/lostも確認）
+        session.won = bool(game_state_tw.get("won", False))
+        session.done = bool(done or session.won or game_state_tw.get("lost", False))
+    
+    def _to_game_state(self, session: Session, reward: Optional[int] = None) -> GameState:
+        """セッションの状態をGameStateに変換"""
         return GameState(
-            session_id=session_id,
-            observation=observation,
-            available_actions=available_actions,
-            score=score,
+            session_id=session.session_id,
+            observation=session.observation,
+            available_actions=session.available_actions,
+            score=session.score,
             reward=reward,
-            done=done,
+            done=session.done,
             max_steps=settings.default_max_steps,
-            current_step=current_step
+            current_step=session.current_step,
+            version=session.state_version
         )
 
-
 # シングルトンインスタンス
 textworld_service = TextWorldService()
 
@@ -107,7 +107,7 @@ DEPLOY_CMD="gcloud run deploy $SERVICE_NAME \
   --memory 2Gi \
   --cpu 2 \
   --timeout 300 \
-  --update-env-vars FRONTEND_URL=${FRONTEND_URL}"
+  --update-env-vars FRONTEND_URL=${FRONTEND_URL},TRUST_FORWARDED_FOR=true"
 
 # Gemini APIキーが設定されている場合は、シークレットとして追加
 if [ "$USE_EXISTING_SECRET" = true ]; then
@@ -0,0 +1,148 @@
+"""
+テスト共通のフィクスチャ
+
+TextWorldのゲームファイルやコンパイル済み環境を使わずにAPI・セッション処理を検証できるよう、
+決定的に動作する小さなゲーム環境（FakeEnv）を提供する。
+"""
+
+import random
+from collections import OrderedDict
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.core.session_manager import session_manager
+from app.core.hibernation import hibernation_store
+from app.core.intern_pool import intern_pools
+from app.core.admission import admission_controller
+from app.services.textworld_service import textworld_service
+from app.services.generation_service import generation_service
+
+
+class FakeInterpreter:
+    """Jerichoのインタプリタ相当（部屋の位置だけを保存・復元できる）"""
+
+    def __init__(self):
+        self.room = "hall"
+
+    def get_state(self):
+        return self.room
+
+    def set_state(self, state):
+        self.room = state
+
+
+class FakeEnv:
+    """
+    2部屋のテスト用ゲーム
+
+    hall --east--> kitchen で鍵を取り、hallに戻って箱を開けるとクリア。
+    持ち物とスコアはTWInform7のStateTrackingと同様にラッパー側（Python側）で保持する。
+    lookの結果には乱数が含まれ、Jerichoと同様にseed()しなければリセットごとに変わる。
+    """
+
+    def __init__(self):
+        self._jericho = FakeInterpreter()
+        self.closed = False
+        self.steps = 0
+        self._seed = None
+        self._rng = random.Random()
+        self._reset_tracking()
+
+    def seed(self, seed):
+        self._seed = seed
+
+    def _reset_tracking(self):
+        self.inventory = set()
+        self.score = 0
+        self.won = False
+
+    def _commands(self):
+        room = self._jericho.room
+        if self.won:
+            return []
+        if room == "hall":
+            commands = ["go east", "look"]
+            if "key" in self.inventory:
+                commands.append("open chest")
+        else:
+            commands = ["go west", "look"]
+            if "key" not in self.inventory:
+                commands.append("take key")
+        return commands
+
+    def _state(self, feedback):
+        return {
+            "feedback": feedback,
+            "description": f"You are in the {self._jericho.room}.",
+            "admissible_commands": self._commands(),
+            "score": self.score,
+            "won": self.won,
+            "lost": False,
+        }
+
+    def reset(self):
+        self._rng = random.Random(self._seed)
+        self._jericho.room = "hall"
+        self._reset_tracking()
+        return self._state("You are in the hall.")
+
+    def step(self, action):
+        self.steps += 1
+        if action not in self._commands():
+            return self._state("You can't do that."), 0, self.won
+
+        if action == "go east":
+            self._jericho.room = "kitchen"
+        elif action == "go west":
+            self._jericho.room = "hall"
+        elif action == "take key":
+            self.inventory.add("key")
+            self.score += 1
+        elif action == "look":
+            return self._state(f"[{self._jericho.room}] You see {self._rng.randint(0, 10**9)} dust motes."), 0, False
+        elif action == "open chest":
+            self.score += 1
+            self.won = True
+
+        return self._state(f"[{self._jericho.room}] {action}"), 0, self.won
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """セッション・休止ファイル・生成ゲームの保存先とレート制限をテストごとに分離"""
+    monkeypatch.setattr(hibernation_store, "directory", str(tmp_path / "sessions"))
+    monkeypatch.setattr(settings, "generated_games_directory", str(tmp_path / "generated"))
+    monkeypatch.setattr(generation_service, "output_dir", str(tmp_path / "generated"))
+    monkeypatch.setattr(admission_controller, "_buckets", OrderedDict())
+    session_manager._sessions.clear()
+    intern_pools._pools.clear()
+    yield
+    session_manager._sessions.clear()
+
+
+@pytest.fixture
+def fake_textworld(monkeypatch):
+    """TextWorld環境をFakeEnvに差し替え（作成された環境のリストを返す）"""
+    envs = []
+
+    def start_env(game_path):
+        env = FakeEnv()
+        envs.append(env)
+        return env
+
+    monkeypatch.setattr(textworld_service, "_start_env", start_env)
+    monkeypatch.setattr(textworld_service, "_get_game_path", lambda game_id: f"{game_id}.z8")
+    monkeypatch.setattr(textworld_service, "_warm_envs", {})
+    return envs
+
+
+@pytest.fixture
+def client():
+    """ライフスパン（ウォームアップ・バックグラウンド処理）を起動しないテストクライアント"""
+    from app.main import app
+    return TestClient(app)
@@ -0,0 +1,224 @@
+"""
+アドミッション制御（トークンバケット・重み付き公平キュー）のテスト
+"""
+
+import asyncio
+
+import pytest
+
+from app.config import settings
+from app.core import admission
+from app.core.admission import TokenBucket, WeightedFairQueue, admission_controller, MODE_MANUAL, MODE_AUTO
+from app.core.exceptions import AdmissionRejected
+from app.core.session_manager import session_manager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(admission.time, "monotonic", fake)
+    return fake
+
+
+def _queue(concurrency=1, max_queue=50):
+    return WeightedFairQueue("engine", concurrency, {MODE_MANUAL: 4, MODE_AUTO: 1}, max_queue)
+
+
+async def _enqueue(queue, modes):
+    """各モードの待機者を順に並べ、枠を得た順序を記録するタスクを返す"""
+    order = []
+
+    async def waiter(mode):
+        await queue.acquire(mode)
+        order.append(mode)
+
+    tasks = []
+    for mode in modes:
+        tasks.append(asyncio.create_task(waiter(mode)))
+        await asyncio.sleep(0)
+    return order, tasks
+
+
+async def _release(queue, times):
+    for _ in range(times):
+        queue.release()
+        await asyncio.sleep(0)
+
+
+def test_token_bucket_allows_burst_then_throttles(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+
+    assert [bucket.try_consume() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_consume() == pytest.approx(0.5)
+
+
+def test_token_bucket_refills_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.try_consume()
+
+    clock.now += 0.5
+    assert bucket.try_consume() == 0.0
+    assert bucket.try_consume() > 0
+
+    clock.now += 60
+    assert bucket.is_full
+    assert bucket.tokens == 3
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_prefers_manual_four_to_one():
+    queue = _queue()
+    await queue.acquire(MODE_AUTO)
+
+    # 自動モードが先に並んでいても、手動モードが重みの比率で優先される
+    order, tasks = await _enqueue(queue, [MODE_AUTO] * 10 + [MODE_MANUAL] * 10)
+    await _release(queue, 10)
+
+    assert order.count(MODE_MANUAL) == 8
+    assert order.count(MODE_AUTO) == 2
+    assert order[:5].count(MODE_MANUAL) == 4
+
+    await _release(queue, 10)
+    await asyncio.gather(*tasks)
+    assert queue.active == 1
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_serves_auto_when_manual_is_idle():
+    queue = _queue()
+    await queue.acquire(MODE_MANUAL)
+
+    order, tasks = await _enqueue(queue, [MODE_AUTO] * 3)
+    await _release(queue, 3)
+    await asyncio.gather(*tasks)
+
+    assert order == [MODE_AUTO] * 3
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_skips_cancelled_waiters():
+    queue = _queue()
+    await queue.acquire(MODE_MANUAL)
+
+    order, tasks = await _enqueue(queue, [MODE_MANUAL, MODE_MANUAL])
+    tasks[0].cancel()
+    await asyncio.sleep(0)
+    assert queue.depth == 1
+
+    await _release(queue, 1)
+    await tasks[1]
+
+    assert order == [MODE_MANUAL]
+    assert queue.active == 1
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_hands_slot_on_when_granted_waiter_is_cancelled():
+    queue = _queue()
+    await queue.acquire(MODE_MANUAL)
+
+    order, tasks = await _enqueue(queue, [MODE_MANUAL, MODE_AUTO])
+
+    # 枠を割り当てた直後（タスクが再開する前）にキャンセルされた場合も、枠は次の待機者に渡る
+    queue.release()
+    tasks[0].cancel()
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    await tasks[1]
+
+    assert order == [MODE_AUTO]
+    assert queue.active == 1
+    assert queue.depth == 0
+
+
+@pytest.mark.asyncio
+async def test_fair_queue_sheds_when_full():
+    queue = _queue(max_queue=2)
+    await queue.acquire(MODE_MANUAL)
+    _, tasks = await _enqueue(queue, [MODE_MANUAL, MODE_AUTO])
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await queue.acquire(MODE_MANUAL)
+
+    assert queue.shed == 1
+    assert excinfo.value.retry_after >= 1.0
+
+    await _release(queue, 2)
+    await asyncio.gather(*tasks)
+
+
+def test_reset_is_rate_limited_per_client_without_orphans(fake_textworld, client, monkeypatch):
+    monkeypatch.setattr(settings, "session_burst", 3)
+    monkeypatch.setattr(settings, "session_rate_per_second", 0.001)
+
+    statuses = [client.post("/reset", json={"game_id": "simple_game"}).status_code for _ in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+    assert len(session_manager.get_all_sessions()) == 3
+
+
+def test_reset_limit_ignores_spoofed_forwarded_for(fake_textworld, client, monkeypatch):
+    monkeypatch.setattr(settings, "session_burst", 2)
+    monkeypatch.setattr(settings, "session_rate_per_second", 0.001)
+    monkeypatch.setattr(settings, "trust_forwarded_for", True)
+
+    # 先頭側（クライアントが付けた値）を毎回変えても、末尾の接続元IPが同じなら同じバケット
+    statuses = [
+        client.post(
+            "/reset",
+            json={"game_id": "simple_game"},
+            headers={"X-Forwarded-For": f"10.0.0.{i}, 203.0.113.7"}
+        ).status_code
+        for i in range(3)
+    ]
+    assert statuses == [200, 200, 429]
+
+    other = client.post("/reset", json={"game_id": "simple_game"}, headers={"X-Forwarded-For": "198.51.100.1"})
+    assert other.status_code == 200
+
+
+def test_forwarded_for_is_ignored_unless_trusted(fake_textworld, client, monkeypatch):
+    monkeypatch.setattr(settings, "session_burst", 1)
+    monkeypatch.setattr(settings, "session_rate_per_second", 0.001)
+
+    statuses = [
+        client.post(
+            "/reset", json={"game_id": "simple_game"}, headers={"X-Forwarded-For": f"10.0.0.{i}"}
+        ).status_code
+        for i in range(2)
+    ]
+    assert statuses == [200, 429]
+
+
+def test_suggest_action_requires_existing_session(client):
+    response = client.post("/gemini/suggest-action", json={
+        "session_id": "made-up-id",
+        "observation": "You are in the hall.",
+        "available_actions": ["look"],
+    })
+
+    assert response.status_code == 404
+    assert len(admission_controller._buckets) == 0
+
+
+def test_buckets_are_bounded_lru(monkeypatch):
+    monkeypatch.setattr(settings, "max_sessions", 2)
+
+    for key in ("a", "b", "c"):
+        admission_controller._get_bucket(key)
+    admission_controller._get_bucket("b")
+    admission_controller._get_bucket("d")
+    admission_controller._get_bucket("e")
+
+    # 上限（max_sessions * 2）を超えたら最も長く使われていないものから破棄
+    assert list(admission_controller._buckets) == ["c", "b", "d", "e"]
@@ -0,0 +1,93 @@
+"""
+差分エンコード（compactモード）のテスト
+"""
+
+from app.core.session_manager import session_manager
+from app.services.textworld_service import textworld_service
+
+
+def _new_game(game_id="simple_game"):
+    session_id = session_manager.create_session(game_id)
+    state = textworld_service.initialize_game(session_id, game_id)
+    return session_id, state
+
+
+def test_known_version_match_returns_delta(fake_textworld):
+    session_id, initial = _new_game()
+
+    compact = textworld_service.execute_action_compact(session_id, "go east", known_version=initial.version)
+
+    assert compact.version == initial.version + 1
+    assert compact.base_version == initial.version
+    assert compact.available_actions is None
+    assert compact.actions_added == ["go west", "take key"]
+    assert compact.actions_removed == ["go east"]
+
+    # 差分を適用すると全量と一致する
+    full = textworld_service.get_session_state(session_manager.get_session(session_id))
+    applied = [a for a in initial.available_actions if a not in compact.actions_removed] + compact.actions_added
+    assert sorted(applied) == sorted(full.available_actions)
+
+
+def test_known_version_mismatch_returns_full_actions(fake_textworld):
+    session_id, initial = _new_game()
+
+    compact = textworld_service.execute_action_compact(session_id, "go east", known_version=initial.version - 1)
+
+    assert compact.base_version is None
+    assert compact.available_actions == ["go west", "look", "take key"]
+    assert compact.actions_added == []
+    assert compact.actions_removed == []
+
+
+def test_without_known_version_returns_full_actions(fake_textworld):
+    session_id, _ = _new_game()
+
+    compact = textworld_service.execute_action_compact(session_id, "go east")
+
+    assert compact.base_version is None
+    assert compact.available_actions == ["go west", "look", "take key"]
+
+
+def test_step_endpoint_compact(fake_textworld, client):
+    reset = client.post("/reset", json={"game_id": "simple_game"})
+    assert reset.status_code == 200
+    initial = reset.json()
+
+    response = client.post("/step", json={
+        "session_id": initial["session_id"],
+        "action": "go east",
+        "compact": True,
+        "known_version": initial["version"],
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body) == {
+        "session_id", "version", "base_version", "observation", "available_actions",
+        "actions_added", "actions_removed", "score", "reward", "done", "max_steps", "current_step",
+    }
+    assert body["version"] == initial["version"] + 1
+    assert body["base_version"] == initial["version"]
+    assert body["available_actions"] is None
+    assert body["actions_added"] == ["go west", "take key"]
+    assert body["actions_removed"] == ["go east"]
+    assert body["current_step"] == 1
+
+
+def test_step_endpoint_compact_resyncs_on_stale_version(fake_textworld, client):
+    initial = client.post("/reset", json={"game_id": "simple_game"}).json()
+    client.post("/step", json={"session_id": initial["session_id"], "action": "go east"})
+
+    # 1つ前のバージョンを基準にした差分要求は全量で返る
+    body = client.post("/step", json={
+        "session_id": initial["session_id"],
+        "action": "take key",
+        "compact": True,
+        "known_version": initial["version"],
+    }).json()
+
+    assert body["base_version"] is None
+    assert body["available_actions"] == ["go west", "look"]
+    assert body["score"] == 1
+    assert body["reward"] == 1
@@ -0,0 +1,81 @@
+"""
+評価ハーネスのテスト
+"""
+
+import asyncio
+import csv
+from dataclasses import asdict
+
+import pytest
+
+from app.core.session_manager import session_manager
+from app.evaluation.runner import EpisodeResult, run_episode, summarize, write_results
+
+# 実行ごとに変わるフィールド
+TIMING_FIELDS = {"wall_time_s", "turn_latency_p95_ms", "turn_latencies_ms"}
+
+
+def _run(policy, seed, max_steps=20):
+    return asyncio.run(run_episode("simple_game", policy, seed, max_steps))
+
+
+def _outcome(result):
+    return {name: value for name, value in asdict(result).items() if name not in TIMING_FIELDS}
+
+
+@pytest.mark.parametrize("policy", ["stub", "random"])
+def test_same_seed_and_policy_give_same_result(fake_textworld, policy):
+    first = _run(policy, seed=7)
+    second = _run(policy, seed=7)
+
+    assert first.error is None
+    assert _outcome(first) == _outcome(second)
+    assert len(first.turn_latencies_ms) == first.steps
+    # エピソード終了後にセッションと環境が片付けられている
+    assert session_manager.get_all_sessions() == {}
+    assert all(env.closed for env in fake_textworld)
+
+
+def test_stub_policy_wins_fake_game(fake_textworld):
+    result = _run("stub", seed=1)
+
+    assert result.won
+    assert result.score == 2
+    assert result.steps_to_win == result.steps
+    assert result.llm_calls == result.steps
+    assert result.tokens > 0
+
+
+def test_episode_stops_at_max_steps(fake_textworld):
+    result = _run("random", seed=3, max_steps=2)
+
+    assert result.steps <= 2
+
+
+def _result(policy, latencies, won=False):
+    return EpisodeResult(
+        game_id="simple_game", policy=policy, seed=0, score=0, won=won, steps=len(latencies),
+        steps_to_win=len(latencies) if won else None, llm_calls=0, fallback_calls=0, tokens=0,
+        wall_time_s=0.0, turn_latency_p95_ms=0.0, turn_latencies_ms=latencies
+    )
+
+
+def test_summary_p95_uses_all_turns():
+    # エピソードごとのp95を集計すると遅いエピソードが上位5%に入らないが、ターン数では約1割が遅い
+    fast = [_result("stub", [1.0] * 20) for _ in range(19)]
+    slow = _result("stub", [100.0] * 40)
+
+    summary = summarize(fast + [slow])
+
+    assert summary[0]["episodes"] == 20
+    assert summary[0]["turn_latency_p95_ms"] == 100.0
+
+
+def test_write_results_omits_raw_latencies(tmp_path):
+    path = write_results([_result("stub", [1.0, 2.0], won=True)], str(tmp_path / "results.csv"))
+
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    assert "turn_latencies_ms" not in rows[0]
+    assert rows[0]["won"] == "True"
@@ -0,0 +1,127 @@
+"""
+生成ゲームのファイル削除のテスト
+"""
+
+import os
+import time
+from collections import deque
+
+import pytest
+
+from app.config import settings
+from app.core.session_manager import session_manager
+from app.core.hibernation import hibernation_store
+from app.services.generation_service import generation_service
+from app.services.textworld_service import textworld_service
+
+
+def _write_game_files(game_id):
+    os.makedirs(generation_service.output_dir, exist_ok=True)
+    paths = [os.path.join(generation_service.output_dir, f"{game_id}{ext}") for ext in (".z8", ".json", ".ni")]
+    for path in paths:
+        with open(path, "w") as f:
+            f.write("game")
+    return paths
+
+
+def test_generated_game_removed_when_session_deleted():
+    paths = _write_game_files("gen_0000000000000001")
+
+    session_id = session_manager.create_session("gen_0000000000000001")
+    session_manager.delete_session(session_id)
+
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_generated_game_kept_while_in_use():
+    paths = _write_game_files("gen_0000000000000002")
+
+    first = session_manager.create_session("gen_0000000000000002")
+    second = session_manager.create_session("gen_0000000000000002")
+    session_manager.delete_session(first)
+
+    assert all(os.path.exists(path) for path in paths)
+
+    session_manager.delete_session(second)
+
+    assert not any(os.path.exists(path) for path in paths)
+
+
+def test_stocked_and_static_games_are_kept(monkeypatch):
+    stocked = _write_game_files("gen_0000000000000003")
+    static = _write_game_files("simple_game")
+    monkeypatch.setitem(generation_service._stock, "easy", deque(["gen_0000000000000003"]))
+
+    assert not generation_service.release_game("gen_0000000000000003")
+    assert not generation_service.release_game("simple_game")
+    assert all(os.path.exists(path) for path in stocked + static)
+
+
+def test_generated_game_removed_when_hibernated_session_expires():
+    paths = _write_game_files("gen_0000000000000004")
+
+    session_id = session_manager.create_session("gen_0000000000000004")
+    session = session_manager.get_session(session_id)
+    hibernation_store.save(session_id, {"session": session.to_snapshot()})
+    del session_manager._sessions[session_id]
+
+    # 保持期間を過ぎたことにする
+    expired_at = time.time() - settings.hibernated_session_timeout - 1
+    os.utime(hibernation_store._path(session_id), (expired_at, expired_at))
+
+    assert session_manager.cleanup_hibernated_sessions() == 1
+    assert hibernation_store.load(session_id) is None
+    assert not any(os.path.exists(path) for path in paths)
+
+
+@pytest.fixture
+def fake_generation(monkeypatch):
+    """ゲーム生成をファイル書き込みだけに差し替え"""
+    counter = iter(range(1, 10000))
+
+    async def generate(spec):
+        game_id = f"gen_{next(counter):016d}"
+        _write_game_files(game_id)
+        return game_id
+
+    monkeypatch.setattr(generation_service, "generate", generate)
+
+
+def _generated_games():
+    if not os.path.isdir(generation_service.output_dir):
+        return set()
+    return {name.split(".", 1)[0] for name in os.listdir(generation_service.output_dir)}
+
+
+def test_rejected_resets_do_not_take_or_leak_games(fake_textworld, fake_generation, client, monkeypatch):
+    monkeypatch.setattr(settings, "session_burst", 10)
+    monkeypatch.setattr(settings, "session_rate_per_second", 0.001)
+
+    statuses = [client.post("/reset", json={"difficulty": "easy"}).status_code for _ in range(20)]
+
+    assert statuses.count(200) == 10
+    assert statuses.count(429) == 10
+    in_use = {session.game_id for session in session_manager.get_all_sessions().values()}
+    assert _generated_games() == in_use
+    assert len(in_use) == 10
+
+
+def test_failed_initialization_releases_generated_game(fake_textworld, fake_generation, client, monkeypatch):
+    def fail(session_id, game_id):
+        raise RuntimeError("engine crashed")
+
+    monkeypatch.setattr(textworld_service, "initialize_game", fail)
+
+    assert client.post("/reset", json={"difficulty": "easy"}).status_code == 500
+    assert session_manager.get_all_sessions() == {}
+    assert _generated_games() == set()
+
+
+def test_failed_session_creation_releases_generated_game(fake_textworld, fake_generation, client, monkeypatch):
+    def fail(game_id):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(session_manager, "create_session", fail)
+
+    assert client.post("/reset", json={"difficulty": "easy"}).status_code == 500
+    assert _generated_games() == set()
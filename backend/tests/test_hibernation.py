@@ -0,0 +1,312 @@
+"""
+セッション休止・復元のテスト
+"""
+
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.config import settings
+from app.core.admission import admission_controller
+from app.core.exceptions import TextWorldError
+from app.core.hibernation import HibernationStore, hibernation_store
+from app.core.intern_pool import intern_pools
+from app.core.session_manager import Session, session_manager
+from app.services import textworld_service as textworld_module
+from app.services.textworld_service import textworld_service
+
+ACTIONS = ["go east", "take key", "go west", "open chest"]
+
+
+def _new_game():
+    session_id = session_manager.create_session("simple_game")
+    textworld_service.initialize_game(session_id, "simple_game")
+    return session_id
+
+
+def _comparable(state):
+    return state.model_dump(exclude={"session_id"})
+
+
+def _hibernate_now(session_id):
+    session = session_manager.get_all_sessions()[session_id]
+    session.last_accessed = datetime.now() - timedelta(seconds=settings.hibernate_after + 1)
+    assert session_manager.hibernate_idle_sessions() == 1
+    assert session_id not in session_manager.get_all_sessions()
+
+
+def test_rehydrated_session_matches_straight_play(fake_textworld):
+    straight_id = _new_game()
+    straight = [textworld_service.execute_action(straight_id, action) for action in ACTIONS]
+
+    resumed_id = _new_game()
+    resumed = []
+    for action in ACTIONS:
+        _hibernate_now(resumed_id)
+        resumed.append(textworld_service.execute_action(resumed_id, action))
+
+    assert [_comparable(state) for state in resumed] == [_comparable(state) for state in straight]
+    assert resumed[-1].done
+    assert session_manager.get_session(resumed_id).won
+
+
+def test_hibernation_closes_env_and_restores_tracking_state(fake_textworld):
+    session_id = _new_game()
+    for action in ACTIONS[:3]:
+        textworld_service.execute_action(session_id, action)
+    env = session_manager.get_session(session_id).game_env
+
+    _hibernate_now(session_id)
+    assert env.closed
+
+    session = session_manager.get_session(session_id)
+    assert session.game_env is not env
+    assert not session.hibernated
+    # ラッパー側で保持している持ち物（鍵）も戻っていること
+    assert "open chest" in session.game_env._commands()
+    assert session.available_actions == ("go east", "look", "open chest")
+
+
+def test_websocket_rehydrates_hibernated_session(fake_textworld, client):
+    session_id = client.post("/reset", json={"game_id": "simple_game"}).json()["session_id"]
+    client.post("/step", json={"session_id": session_id, "action": "go east"})
+    _hibernate_now(session_id)
+
+    with client.websocket_connect(f"/ws/{session_id}") as websocket:
+        websocket.send_json({"type": "action", "action": "take key"})
+        message = websocket.receive_json()
+
+    assert message["type"] == "state"
+    assert message["data"]["current_step"] == 2
+    assert message["data"]["score"] == 1
+
+
+def test_session_with_work_in_flight_is_not_hibernated(fake_textworld):
+    session_id = _new_game()
+    session = session_manager.get_session(session_id)
+    env = session.game_env
+    results = []
+
+    def step_while_hibernating(action):
+        # ステップ中にバックグラウンドの休止処理が走った場合
+        session.last_accessed = datetime.now() - timedelta(seconds=settings.hibernate_after + 1)
+        results.append(session_manager.hibernate_idle_sessions())
+        results.append(session_manager.hibernate_session(session_id))
+        return type(env).step(env, action)
+
+    env.step = step_while_hibernating
+    state = textworld_service.execute_action(session_id, "go east")
+
+    assert results == [0, False]
+    assert not env.closed
+    assert state.current_step == 1
+    assert session.in_flight == 0
+    # 処理の終了時に最終アクセス時刻が更新され、直後に休止されない
+    assert session_manager.hibernate_idle_sessions() == 0
+
+
+def test_held_session_object_is_reregistered_after_restore(fake_textworld):
+    session_id = _new_game()
+    session = session_manager.get_session(session_id)
+    _hibernate_now(session_id)
+
+    textworld_service.execute_action_on_session(session, "go east")
+
+    assert session_manager.get_session(session_id) is session
+    assert session.current_step == 1
+
+
+def test_store_save_load_delete(tmp_path):
+    store = HibernationStore(str(tmp_path / "store"))
+    payload = {"session": {"session_id": "abc", "action_log": ["go east"] * 50}}
+
+    size = store.save("abc", payload)
+
+    assert 0 < size == os.path.getsize(store._path("abc"))
+    assert store.load("abc") == payload
+    assert store.count() == 1
+    assert not any(name.endswith(".tmp") for name in os.listdir(store.directory))
+
+    store.delete("abc")
+    store.delete("abc")
+    assert store.load("abc") is None
+    assert store.count() == 0
+
+
+def test_store_rejects_path_like_ids(tmp_path):
+    store = HibernationStore(str(tmp_path / "store"))
+
+    with pytest.raises(ValueError):
+        store.save("../escape", {})
+    assert store.load("../escape") is None
+    assert store.count() == 0
+
+
+def test_store_expired(tmp_path):
+    store = HibernationStore(str(tmp_path / "store"))
+    assert store.expired(60) == []
+
+    store.save("old", {})
+    store.save("new", {})
+    expired_at = time.time() - 120
+    os.utime(store._path("old"), (expired_at, expired_at))
+
+    assert store.expired(60) == ["old"]
+    store.delete("old")
+    assert store.expired(60) == []
+    assert store.load("old") is None
+    assert store.load("new") == {}
+
+
+def test_session_snapshot_round_trip():
+    session = Session("sid", "simple_game")
+    session.current_step = 2
+    session.state_version = 3
+    session.observation = "You are in the hall."
+    session.available_actions = ("go east", "look", "open chest")
+    session.score = 1
+    session.done = False
+    session.won = False
+    session.record_action("go east")
+    session.record_action("go west")
+    session.game_env = object()
+    session.websocket = object()
+
+    snapshot = session.to_snapshot()
+    assert set(snapshot) == set(Session.SNAPSHOT_FIELDS)
+
+    restored = Session.from_snapshot(snapshot)
+
+    assert restored.to_snapshot() == snapshot
+    assert restored.game_env is None
+    assert restored.websocket is None
+    assert restored.in_flight == 0
+    # テキストはInternPoolの共有オブジェクトに置き換わる
+    pool = intern_pools.get("simple_game")
+    assert restored.available_actions is pool.intern_actions(["go east", "look", "open chest"])
+    assert restored.action_log[0] is restored.available_actions[0]
+
+
+def test_action_log_is_bounded_and_counted(monkeypatch):
+    monkeypatch.setattr(settings, "action_log_max_entries", 3)
+    session = Session("sid", "simple_game")
+    empty = session.memory_usage()["own"]
+
+    session.record_action("a long action that is not shared with anything " * 4)
+    assert session.memory_usage()["own"] > empty + 200
+
+    for _ in range(2):
+        session.record_action("look")
+    assert len(session.action_log) == 3
+
+    # 上限を超えたら履歴を破棄し、休止の対象から外す
+    session.record_action("look")
+    assert session.action_log is None
+    session.record_action("look")
+    assert session.action_log is None
+
+
+def test_session_over_action_log_limit_stays_resident(fake_textworld, monkeypatch):
+    monkeypatch.setattr(settings, "action_log_max_entries", 2)
+    session_id = _new_game()
+    for action in ACTIONS:
+        textworld_service.execute_action(session_id, action)
+
+    session = session_manager.get_all_sessions()[session_id]
+    session.last_accessed = datetime.now() - timedelta(seconds=settings.hibernate_after + 1)
+
+    assert session_manager.hibernate_idle_sessions() == 0
+    assert not session_manager.hibernate_session(session_id)
+    assert session.game_env is not None
+
+
+def test_restoring_one_session_does_not_block_others(fake_textworld, monkeypatch):
+    slow_id = _new_game()
+    other_id = _new_game()
+    textworld_service.execute_action(slow_id, "go east")
+    _hibernate_now(slow_id)
+
+    started = threading.Event()
+    release = threading.Event()
+    restore = textworld_service._restore_env
+
+    def slow_restore(session):
+        started.set()
+        release.wait(5)
+        restore(session)
+
+    monkeypatch.setattr(session_manager, "_restore_env", slow_restore)
+
+    restoring = threading.Thread(target=session_manager.get_session, args=(slow_id,))
+    restoring.start()
+    assert started.wait(5)
+
+    # 別セッションのステップは復元中のリプレイを待たない
+    finished = threading.Event()
+    worker = threading.Thread(
+        target=lambda: (textworld_service.execute_action(other_id, "go east"), finished.set())
+    )
+    worker.start()
+    assert finished.wait(2)
+
+    release.set()
+    restoring.join(5)
+    worker.join(5)
+    assert session_manager.get_session(slow_id).current_step == 1
+
+
+def test_websocket_bind_is_admission_controlled(fake_textworld, client, monkeypatch):
+    session_id = client.post("/reset", json={"game_id": "simple_game"}).json()["session_id"]
+    _hibernate_now(session_id)
+    monkeypatch.setattr(settings, "session_burst", 1)
+    monkeypatch.setattr(settings, "session_rate_per_second", 0.001)
+    admission_controller._buckets.clear()
+    admission_controller._get_bucket(session_id).try_consume()
+
+    with client.websocket_connect(f"/ws/{session_id}") as websocket:
+        error = websocket.receive_json()
+        closed = websocket.receive()
+
+    assert error["error"] == "Too many requests"
+    assert closed["code"] == 1013
+    # 拒否された場合は復元されず、休止したまま
+    assert session_id not in session_manager.get_all_sessions()
+
+
+def test_replay_is_deterministic_for_random_games(fake_textworld, monkeypatch):
+    # 両方のセッションを同じシードで開始する
+    monkeypatch.setattr(textworld_module.random, "randrange", lambda n: 42)
+    actions = ["look", "go east", "look", "take key", "look"]
+
+    straight_id = _new_game()
+    straight = [textworld_service.execute_action(straight_id, action) for action in actions]
+
+    resumed_id = _new_game()
+    resumed = []
+    for action in actions:
+        _hibernate_now(resumed_id)
+        resumed.append(textworld_service.execute_action(resumed_id, action))
+
+    assert [_comparable(state) for state in resumed] == [_comparable(state) for state in straight]
+    assert session_manager.get_session(resumed_id).seed == 42
+
+
+def test_diverging_replay_raises_clear_error(fake_textworld):
+    session_id = _new_game()
+    textworld_service.execute_action(session_id, "look")
+    _hibernate_now(session_id)
+
+    # 別のシードでリプレイされた場合（乱数の結果が休止前と変わる）
+    payload = hibernation_store.load(session_id)
+    payload["session"]["seed"] += 1
+    hibernation_store.save(session_id, payload)
+
+    with pytest.raises(TextWorldError, match="diverged"):
+        textworld_service.execute_action(session_id, "go east")
+
+    # 復元できなかったセッションはディスクに残り、作り直した環境は閉じられる
+    assert hibernation_store.exists(session_id)
+    assert fake_textworld[-1].closed
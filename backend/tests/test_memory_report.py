@@ -0,0 +1,21 @@
+"""
+メモリレポート（/admin/memory）のテスト
+"""
+
+from app.config import settings
+
+
+def test_memory_report_disabled_by_default(client):
+    assert client.get("/admin/memory").status_code == 404
+
+
+def test_memory_report_truncates_session_ids(fake_textworld, client, monkeypatch):
+    monkeypatch.setattr(settings, "memory_report_enabled", True)
+    session_id = client.post("/reset", json={"game_id": "simple_game"}).json()["session_id"]
+
+    report = client.get("/admin/memory").json()
+
+    assert report["session_count"] == 1
+    assert report["env_count"] == 1
+    assert report["sessions"][0]["session_id"] == session_id[:8]
+    assert session_id not in str(report)
@@ -0,0 +1,84 @@
+"""
+プロファイラのテスト
+"""
+
+import os
+import time
+import threading
+
+from app.config import settings
+from app.core.profiler import StackSampler, profiler
+
+
+def _busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_skips_idle_threads():
+    stop = threading.Event()
+    idle = threading.Thread(target=stop.wait, daemon=True)
+    busy = threading.Thread(target=_busy, args=(stop,), daemon=True)
+    idle.start()
+    busy.start()
+
+    sampler = StackSampler(0.001)
+    sampler.start()
+    time.sleep(0.1)
+    sampler.stop()
+    stop.set()
+
+    stacks = [stack for stack, _ in sampler.snapshot()]
+    assert any("_busy" in stack for stack in stacks)
+    assert not any(stack.rsplit(";", 1)[-1].startswith("wait ") for stack in stacks)
+    assert sampler.idle_samples > 0
+
+
+def test_saved_profiles_are_capped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "profiling_output_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_max_files", 3)
+    for i in range(5):
+        with open(tmp_path / f"20260101-00000{i}_step_abcdef.folded", "w") as f:
+            f.write("a;b 1\n")
+
+    profiler._prune()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "20260101-000002_step_abcdef.folded",
+        "20260101-000003_step_abcdef.folded",
+        "20260101-000004_step_abcdef.folded",
+    ]
+
+
+def _profiled_client(monkeypatch, tmp_path, header_enabled):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(settings, "profiling_output_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_header_enabled", header_enabled)
+
+    app = FastAPI()
+    app.middleware("http")(profiler.middleware)
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+def test_profile_header_ignored_by_default(tmp_path, monkeypatch):
+    client = _profiled_client(monkeypatch, tmp_path, header_enabled=False)
+
+    response = client.get("/ping", headers={"X-Profile": "1"})
+
+    assert "X-Profile-Id" not in response.headers
+    assert profiler.list_profiles() == []
+
+
+def test_profile_header_honoured_when_enabled(tmp_path, monkeypatch):
+    client = _profiled_client(monkeypatch, tmp_path, header_enabled=True)
+
+    response = client.get("/ping", headers={"X-Profile": "1"})
+
+    assert profiler.list_profiles() == [response.headers["X-Profile-Id"]]
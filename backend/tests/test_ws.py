@@ -0,0 +1,73 @@
+"""
+WebSocketチャネルのテスト
+"""
+
+
+def _new_session(client):
+    return client.post("/reset", json={"game_id": "simple_game"}).json()["session_id"]
+
+
+def test_non_json_frames_get_error_and_keep_connection(fake_textworld, client):
+    session_id = _new_session(client)
+
+    with client.websocket_connect(f"/ws/{session_id}") as websocket:
+        websocket.send_text("go east")
+        text_error = websocket.receive_json()
+        websocket.send_bytes(b"\x00\x01")
+        bytes_error = websocket.receive_json()
+
+        # 接続は維持され、続けてアクションを実行できる
+        websocket.send_json({"type": "action", "action": "go east"})
+        state = websocket.receive_json()
+
+    assert text_error["type"] == "error" and text_error["error"] == "Invalid message"
+    assert bytes_error["type"] == "error" and bytes_error["error"] == "Invalid message"
+    assert state["type"] == "state"
+    assert state["data"]["current_step"] == 1
+
+
+def test_invalid_message_shape_gets_error(fake_textworld, client):
+    session_id = _new_session(client)
+
+    with client.websocket_connect(f"/ws/{session_id}") as websocket:
+        websocket.send_json({"type": "unknown"})
+        error = websocket.receive_json()
+
+    assert error["error"] == "Invalid message"
+
+
+def test_unknown_session_is_closed(client):
+    with client.websocket_connect("/ws/missing") as websocket:
+        error = websocket.receive_json()
+        closed = websocket.receive()
+
+    assert error["error"] == "Session not found"
+    assert closed["code"] == 4404
+
+
+def test_suggest_uses_current_state_after_http_step(fake_textworld, client, monkeypatch):
+    from app.models.requests import ActionSuggestion
+    from app.services.gemini_service import gemini_service
+
+    observations = []
+
+    async def suggest_action(observation, available_actions, score, user_instruction=None):
+        observations.append(observation)
+        return ActionSuggestion(suggested_action=available_actions[0])
+
+    monkeypatch.setattr(gemini_service, "suggest_action", suggest_action)
+    session_id = _new_session(client)
+
+    with client.websocket_connect(f"/ws/{session_id}") as websocket:
+        websocket.send_json({"type": "action", "action": "look"})
+        websocket.receive_json()
+
+        # 同じセッションをHTTPのフォールバック経路で進める
+        client.post("/step", json={"session_id": session_id, "action": "go east"})
+
+        websocket.send_json({"type": "suggest"})
+        suggestion = websocket.receive_json()
+
+    assert suggestion["type"] == "suggestion"
+    assert observations == ["[kitchen] go east"]
+    assert suggestion["data"]["suggested_action"] == "go west"
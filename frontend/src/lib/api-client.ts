@@ -24,9 +24,94 @@ export interface GeminiActionResponse {
   is_fallback: boolean;
 }
 
+export type PlayMode = 'manual' | 'auto';
+
+type ChannelMessage =
+  | { type: 'state'; data: StepResponse }
+  | { type: 'suggestion'; data: GeminiActionResponse }
+  | { type: 'error'; error: string; detail?: string };
+
+interface Pending {
+  kind: 'state' | 'suggestion';
+  resolve: (value: StepResponse | GeminiActionResponse) => void;
+  reject: (reason: Error) => void;
+}
+
+/**
+ * セッション単位の永続WebSocketチャネル。
+ * アクションごとのHTTPリクエストの代わりに1本の接続でアクション送信と状態受信を行う。
+ */
+class GameChannel {
+  private socket: WebSocket;
+  private ready: Promise<void>;
+  // サーバーはメッセージを順番に処理するため、応答は送信順に届く
+  private pending: Pending[] = [];
+  onSuggestion: ((suggestion: GeminiActionResponse) => void) | null = null;
+
+  constructor(url: string) {
+    this.socket = new WebSocket(url);
+    this.ready = new Promise((resolve, reject) => {
+      this.socket.addEventListener('open', () => resolve(), { once: true });
+      this.socket.addEventListener('error', () => reject(new Error('WebSocket connection failed')), { once: true });
+    });
+    this.socket.addEventListener('message', (event) => this.handleMessage(event));
+    this.socket.addEventListener('close', () => this.failAll(new Error('WebSocket closed')));
+  }
+
+  get isOpen(): boolean {
+    return this.socket.readyState === WebSocket.OPEN;
+  }
+
+  async waitUntilOpen(): Promise<void> {
+    return this.ready;
+  }
+
+  sendAction(action: string, mode: PlayMode): Promise<StepResponse> {
+    return new Promise((resolve, reject) => {
+      this.pending.push({ kind: 'state', resolve: (value) => resolve(value as StepResponse), reject });
+      this.socket.send(JSON.stringify({ type: 'action', action, mode }));
+    });
+  }
+
+  requestSuggestion(mode: PlayMode, userInstruction?: string): Promise<GeminiActionResponse> {
+    return new Promise((resolve, reject) => {
+      this.pending.push({ kind: 'suggestion', resolve: (value) => resolve(value as GeminiActionResponse), reject });
+      this.socket.send(JSON.stringify({ type: 'suggest', mode, user_instruction: userInstruction }));
+    });
+  }
+
+  close(): void {
+    this.socket.close();
+  }
+
+  private handleMessage(event: MessageEvent): void {
+    const message: ChannelMessage = JSON.parse(event.data);
+    if (message.type === 'error') {
+      this.pending.shift()?.reject(new Error(message.detail || message.error));
+      return;
+    }
+    if (this.pending[0]?.kind === message.type) {
+      this.pending.shift()!.resolve(message.data);
+      return;
+    }
+    // 要求していない推奨アクションはサーバーからのプッシュとして扱う
+    if (message.type === 'suggestion') {
+      this.onSuggestion?.(message.data);
+    }
+  }
+
+  private failAll(error: Error): void {
+    this.pending.forEach((pending) => pending.reject(error));
+    this.pending = [];
+  }
+}
+
 export class TextWorldAPIClient {
   private baseURL: string;
   private currentSessionId: string | null = null;
+  private channel: GameChannel | null = null;
+  // サーバー側のスケジューリング優先度（手動モードが優先される）
+  private mode: PlayMode = 'manual';
 
   constructor(baseURL: string = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000') {
     this.baseURL = baseURL;
@@ -55,24 +140,51 @@ export class TextWorldAPIClient {
     }
   }
 
-  async createSession(gameId: string = 'simple_game'): Promise<ResetResponse> {
+  async createSession(gameId: string = 'simple_game', mode: PlayMode = 'manual'): Promise<ResetResponse> {
+    this.mode = mode;
     const response = await this.request<ResetResponse>('/reset', {
       method: 'POST',
       body: JSON.stringify({ game_id: gameId }),
     });
     this.currentSessionId = response.session_id;
+    await this.openChannel(response.session_id);
     return response;
   }
 
+  private async openChannel(sessionId: string): Promise<void> {
+    this.channel?.close();
+    this.channel = null;
+
+    const wsURL = `${this.baseURL.replace(/^http/, 'ws')}/ws/${sessionId}`;
+    const channel = new GameChannel(wsURL);
+    try {
+      await channel.waitUntilOpen();
+      this.channel = channel;
+    } catch (error) {
+      // WebSocketが使えない環境ではHTTPにフォールバック
+      console.warn('Game channel unavailable, falling back to HTTP:', error);
+    }
+  }
+
+  onSuggestion(handler: ((suggestion: GeminiActionResponse) => void) | null): void {
+    if (this.channel) {
+      this.channel.onSuggestion = handler;
+    }
+  }
+
   async executeAction(action: string): Promise<StepResponse> {
     if (!this.currentSessionId) {
       throw new Error('No active session');
     }
+    if (this.channel?.isOpen) {
+      return this.channel.sendAction(action, this.mode);
+    }
     return this.request<StepResponse>('/step', {
       method: 'POST',
       body: JSON.stringify({
         session_id: this.currentSessionId,
         action,
+        mode: this.mode,
       }),
     });
   }
@@ -86,6 +198,9 @@ export class TextWorldAPIClient {
     if (!this.currentSessionId) {
       throw new Error('No active session');
     }
+    if (this.channel?.isOpen) {
+      return this.channel.requestSuggestion(this.mode, userInstruction);
+    }
     return this.request<GeminiActionResponse>('/gemini/suggest-action', {
       method: 'POST',
       body: JSON.stringify({
@@ -94,6 +209,7 @@ export class TextWorldAPIClient {
         available_actions: availableActions,
         score,
         user_instruction: userInstruction,
+        mode: this.mode,
       }),
     });
   }
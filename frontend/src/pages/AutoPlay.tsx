@@ -70,7 +70,7 @@ export default function AutoPlay() {
         console.warn('Health check failed:', e);
       }
       
-      const response = await apiClient.createSession();
+      const response = await apiClient.createSession('simple_game', 'auto');
       console.log('Session created:', response);
       console.log('Current session ID:', apiClient.getCurrentSessionId());
       